@@ -9,7 +9,8 @@ from tutils.db import (
     get_standard_db_handle,
     setup_index,
     get_connection_string,
-    dump_id_collection,
+    dump_id_collections,
+    DatabaseError,
 )
 from tutils.parser import standard_parser, parse_server
 from tutils.config import get_config
@@ -20,6 +21,12 @@ from tutils.general import (
     write_json,
 )
 from tutils.logging import setup_logging, log_msg, start_message
+from tutils.constants import (
+    biomarker_default,
+    canonical_id_default,
+    second_level_id_default,
+    unreviewed_default,
+)
 
 LOGGER = setup_logging("id_assign.log")
 
@@ -40,16 +47,15 @@ def main() -> None:
     start_message(logger=LOGGER, msg="Beginning ID assignment process.")
 
     config_obj = get_config()
-    db_name = config_obj["dbinfo"]["dbname"]
 
     data_root_path = config_obj["data_path"]
     generated_path_segment = config_obj["generated_path_segment"]
     new_data_segment = config_obj["new_data_segment"]
 
-    canonical_id_collection = config_obj["dbinfo"][db_name]["canonical_id_map"]
-    second_level_id_collection = config_obj["dbinfo"][db_name]["second_level_id_map"]
-    data_collection = config_obj["dbinfo"][db_name]["collection"]
-    unreviewed_collection = config_obj["dbinfo"][db_name]["unreviewed_collection"]
+    canonical_id_collection = canonical_id_default()
+    second_level_id_collection = second_level_id_default()
+    data_collection = biomarker_default()
+    unreviewed_collection = unreviewed_default()
 
     dbh = get_standard_db_handle(server=server)
 
@@ -112,11 +118,15 @@ def main() -> None:
     )
 
     connection_string = get_connection_string(server=server)
-    if dump_id_collection(
+    # the two ID maps are independent so export them concurrently
+    dump_results = dump_id_collections(
         connection_string=connection_string,
-        save_path=canonical_id_collection_local_path,
-        collection=canonical_id_collection,
-    ):
+        save_paths={
+            canonical_id_collection: canonical_id_collection_local_path,
+            second_level_id_collection: second_level_id_collection_local_path,
+        },
+    )
+    if dump_results[canonical_id_collection]:
         log_msg(
             logger=LOGGER, msg="Successfully dumped canonical ID map.", to_stdout=True
         )
@@ -127,11 +137,7 @@ def main() -> None:
             level="error",
             to_stdout=True,
         )
-    if dump_id_collection(
-        connection_string,
-        second_level_id_collection_local_path,
-        second_level_id_collection,
-    ):
+    if dump_results[second_level_id_collection]:
         log_msg(
             logger=LOGGER,
             msg="Successfully dumped second level ID map.",
@@ -149,4 +155,8 @@ def main() -> None:
 
 
 if __name__ == "__main__":
-    main()
+    try:
+        main()
+    except DatabaseError as e:
+        log_msg(logger=LOGGER, msg=str(e), level="error", to_stdout=True)
+        sys.exit(1)
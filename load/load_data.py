@@ -14,14 +14,16 @@ import sys
 import time
 import os
 import traceback
+from typing import Literal, Optional
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 from tutils.db import (
     get_standard_db_handle,
     get_connection_string,
-    setup_index,
+    setup_indexes,
     create_text_index,
     load_id_collection,
+    DatabaseError,
 )
 from tutils.config import get_config
 from tutils.general import load_json_type_safe, resolve_symlink, get_user_confirmation
@@ -93,28 +95,17 @@ def main() -> None:
         "best_biomarker_role.role",
     ]
     log_msg(logger=LOGGER, msg="Attempting to create indexes...")
-    setup_index(
-        collection=dbh[biomarker_collection],
-        index_field="biomarker_id",
-        unique=True,
-        index_name="biomarker_id_1",
-        logger=LOGGER,
-    )
+    # one create_indexes round trip for all of the regular indexes, a single field
+    # index can be walked in either direction so one index per path covers both sort
+    # orders (same as misc_scripts/create_index.py)
+    index_specs: list[
+        tuple[str, Literal["ascending", "descending"], bool, Optional[str]]
+    ] = [("biomarker_id", "ascending", True, "biomarker_id_1")]
     for path in paths:
-        setup_index(
-            collection=dbh[biomarker_collection],
-            index_field=path,
-            index_name=f"{path}_1",
-            unique=False,
-            order="ascending",
-        )
-        setup_index(
-            collection=dbh[biomarker_collection],
-            index_field=path,
-            index_name=f"{path}_-1",
-            unique=False,
-            order="descending",
-        )
+        index_specs.append((path, "descending", False, f"{path}_-1"))
+    setup_indexes(
+        collection=dbh[biomarker_collection], specs=index_specs, logger=LOGGER
+    )
     create_text_index(collection=dbh[biomarker_collection], logger=LOGGER)
 
     if server != "dev":
@@ -194,7 +185,7 @@ def main() -> None:
             sys.exit(1)
         merged_ops.append(create_load_record_command(record=record, all_text=True))
         if len(merged_ops) == WRITE_BATCH:
-            log_msg(logger=LOGGER, msg=f"Bulk writing at index: {idx + 1}.")
+            log_msg(logger=LOGGER, msg="Bulk writing at index: %s.", args=(idx + 1,))
             bulk_load(dbh=dbh, ops=merged_ops, destination="biomarker")
             total_merged_ops += len(merged_ops)
             merged_ops = []
@@ -224,7 +215,7 @@ def main() -> None:
         record = load_json_type_safe(filepath=file, return_type="dict")
         collision_ops.append(create_load_record_command(record=record, all_text=False))
         if len(collision_ops) == WRITE_BATCH:
-            log_msg(logger=LOGGER, msg=f"Bulk writing at index: {idx + 1}.")
+            log_msg(logger=LOGGER, msg="Bulk writing at index: %s.", args=(idx + 1,))
             bulk_load(dbh=dbh, ops=collision_ops, destination="collision")
             total_collision_ops += len(collision_ops)
             collision_ops = []
@@ -262,4 +253,8 @@ def main() -> None:
 
 
 if __name__ == "__main__":
-    main()
+    try:
+        main()
+    except DatabaseError as e:
+        log_msg(logger=LOGGER, msg=str(e), level="error", to_stdout=True)
+        sys.exit(1)
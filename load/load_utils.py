@@ -1,6 +1,7 @@
 from pymongo.database import Database
-from pymongo import InsertOne
+from pymongo import InsertOne, ReplaceOne
 from typing import Optional, Literal
+from concurrent.futures import ThreadPoolExecutor
 import sys
 import os
 
@@ -27,6 +28,19 @@ COMPONENT_COUNTS: list[dict] = [
         }
     },
 ]
+# computes the unique condition, unique biomarker, and component counts in a single collection scan
+STATS_FACET: list[dict] = [
+    {
+        "$facet": {
+            "unique_condition_count": UNIQUE_COND_COUNT + [{"$count": "count"}],
+            "unique_biomarker_count": [
+                {"$group": {"_id": "$biomarker_id"}},
+                {"$count": "count"},
+            ],
+            "component_counts": COMPONENT_COUNTS,
+        }
+    }
+]
 ENTITY_TYPE_SPLITS: list[dict] = [
     {"$unwind": "$biomarker_component"},
     {
@@ -78,11 +92,15 @@ def _concatenate_fields(document: dict) -> str:
     """
 
     def add_val(value: Optional[str]):
-        if value is not None:
-            value = f"{value.lower().strip()}"
-            if value not in result_str:
-                result_str.append(value)
-
+        if value is None:
+            return
+        value = str(value).strip().lower()
+        if value and value not in seen:
+            seen.add(value)
+            result_str.append(value)
+
+    # the set backs the membership check, the list keeps the insertion order
+    seen: set[str] = set()
     result_str: list[str] = []
     add_val(document["biomarker_id"])
     add_val(document["biomarker_canonical_id"])
@@ -90,8 +108,9 @@ def _concatenate_fields(document: dict) -> str:
     components = document["biomarker_component"]
     for component in components:
         add_val(component["biomarker"])
-        add_val(component["assessed_biomarker_entity"]["recommended_name"])
-        for entity_syn in component["assessed_biomarker_entity"].get("synonyms", []):
+        entity = component["assessed_biomarker_entity"]
+        add_val(entity["recommended_name"])
+        for entity_syn in entity.get("synonyms", []):
             add_val(entity_syn["synonym"])
         add_val(component["assessed_biomarker_entity_id"])
         add_val(component["assessed_entity_type"])
@@ -107,11 +126,13 @@ def _concatenate_fields(document: dict) -> str:
                 add_val(evidence["evidence"])
     for role in document["best_biomarker_role"]:
         add_val(role["role"])
-    add_val(document["condition"]["recommended_name"]["id"])
-    add_val(document["condition"]["recommended_name"]["name"])
-    add_val(document["condition"]["recommended_name"]["description"])
-    add_val(document["condition"]["recommended_name"]["resource"])
-    for cond_syn in document["condition"].get("synonyms", []):
+    condition = document["condition"]
+    condition_name = condition["recommended_name"]
+    add_val(condition_name["id"])
+    add_val(condition_name["name"])
+    add_val(condition_name["description"])
+    add_val(condition_name["resource"])
+    for cond_syn in condition.get("synonyms", []):
         add_val(cond_syn["id"])
         add_val(cond_syn["name"])
         add_val(cond_syn["resource"])
@@ -147,14 +168,22 @@ def process_stats(
     stat_collection: str, optional
         The collection to store the calculated stats.
     """
-    unique_condition_count = _count_documents(
-        dbh=dbh, pipeline=UNIQUE_COND_COUNT, collection=data_collection
-    )
-    unique_biomarker_count = len(dbh[data_collection].distinct("biomarker_id"))
-
-    component_counts = list(
-        dbh[data_collection].aggregate(COMPONENT_COUNTS, allowDiskUse=True)
-    )
+    data_handle = dbh[data_collection]
+    # the entity type splits unwind the components so they can't share the facet scan,
+    # run the two aggregations concurrently instead
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        summary_future = executor.submit(
+            lambda: list(data_handle.aggregate(STATS_FACET, allowDiskUse=True))
+        )
+        entity_type_splits_future = executor.submit(
+            lambda: list(data_handle.aggregate(ENTITY_TYPE_SPLITS, allowDiskUse=True))
+        )
+    summary = summary_future.result()[0]
+    entity_type_splits = entity_type_splits_future.result()
+
+    unique_condition_count = _facet_count(summary["unique_condition_count"])
+    unique_biomarker_count = _facet_count(summary["unique_biomarker_count"])
+    component_counts = summary["component_counts"]
     single_biomarker_count = (
         component_counts[0]["single_biomarker_count"] if component_counts else 0
     )
@@ -168,38 +197,19 @@ def process_stats(
         "single_biomarker_count": single_biomarker_count,
         "multicomponent_biomarker_count": multicomponent_biomarker_count,
     }
-    dbh[stat_collection].replace_one(
-        {"_id": "stats"}, {"_id": "stats", **stats}, upsert=True
-    )
-
-    entity_type_splits = list(
-        dbh[data_collection].aggregate(ENTITY_TYPE_SPLITS, allowDiskUse=True)
+    dbh[stat_collection].bulk_write(
+        [
+            ReplaceOne({"_id": "stats"}, {"_id": "stats", **stats}, upsert=True),
+            ReplaceOne(
+                {"_id": "entity_type_splits"},
+                {"_id": "entity_type_splits", "splits": entity_type_splits},
+                upsert=True,
+            ),
+        ],
+        ordered=False,
     )
-    dbh[stat_collection].replace_one(
-        {"_id": "entity_type_splits"},
-        {"_id": "entity_type_splits", "splits": entity_type_splits},
-        upsert=True,
-    )
-
-
-def _count_documents(dbh: Database, pipeline: list[dict], collection: str) -> int:
-    """Performs the aggregation pipeline and returns the resulting count.
 
-    Parameters
-    ----------
-    dbh : Database
-        The database handle.
-    pipeline: list[dict]
-        The aggregation pipeline to run.
-    collection : str, optional
-        The collection to run the pipeline on.
 
-    Returns
-    -------
-    int
-        The resulting condition count.
-    """
-    result = list(
-        dbh[collection].aggregate(pipeline + [{"$count": "count"}], allowDiskUse=True)
-    )
-    return result[0]["count"] if result else 0
+def _facet_count(facet_result: list[dict]) -> int:
+    """Pulls the count out of a `$count` terminated facet result."""
+    return facet_result[0]["count"] if facet_result else 0
@@ -5,18 +5,21 @@ As the project gets more and more data this approach will be very slow. This is
 world, you could complete this logic in memory and avoid excessive IO calls. However, with the amount of data we currently 
 have that is not feasible.
 
-usage: parser.py [-h] server
+usage: parser.py [-h] [-y] server
 
 positional arguments:
   server      prd/beta/tst/dev
 
 options:
   -h, --help  show this help message and exit
+  -y, --yes   Skip the confirmation prompt for unattended runs.
 """
 
 import ijson
 import time
-import subprocess
+import queue
+import shutil
+import threading
 import glob
 import os
 import sys
@@ -35,12 +38,82 @@ from tutils.parser import standard_parser
 
 LOGGER = setup_logging("preprocess_data.log")
 CHECKPOINT_VAL = 5_000
+# the background reader stays at most PREFETCH_CHUNKS chunks of PREFETCH_CHUNK_SIZE
+# bytes ahead of the parser
+PREFETCH_CHUNK_SIZE = 1 << 20
+PREFETCH_CHUNKS = 8
+
+
+class PrefetchReader:
+    """Minimal binary file-like reader that reads a file ahead of the consumer on a
+    background thread, bounded to PREFETCH_CHUNKS chunks so memory use doesn't grow
+    with the file size. Meant to be passed to ijson and used as a context manager.
+    """
+
+    def __init__(self, file_path: str) -> None:
+        self._chunks: queue.Queue = queue.Queue(maxsize=PREFETCH_CHUNKS)
+        self._stop = threading.Event()
+        self._buffer = b""
+        self._pos = 0
+        self._eof = False
+        self._thread = threading.Thread(
+            target=self._read_ahead, args=(file_path,), daemon=True
+        )
+        self._thread.start()
+
+    def _read_ahead(self, file_path: str) -> None:
+        """Fills the chunk queue, an empty chunk marks the end of the file and any error
+        is handed to the consumer."""
+        try:
+            with open(file_path, "rb") as f:
+                while not self._stop.is_set():
+                    chunk = f.read(PREFETCH_CHUNK_SIZE)
+                    self._put(chunk)
+                    if not chunk:
+                        return
+        except Exception as e:
+            self._put(e)
+
+    def _put(self, item: bytes | Exception) -> None:
+        """Blocks on the bounded queue, giving up if the reader is closed."""
+        while not self._stop.is_set():
+            try:
+                self._chunks.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    def read(self, size: int = -1) -> bytes:
+        """Returns up to size bytes from the current chunk (everything left if size is
+        negative), an empty bytes object once the file is exhausted."""
+        if size < 0:
+            return b"".join(iter(lambda: self.read(PREFETCH_CHUNK_SIZE), b""))
+        while self._pos >= len(self._buffer) and not self._eof:
+            chunk = self._chunks.get()
+            if isinstance(chunk, Exception):
+                raise chunk
+            self._eof = not chunk
+            self._buffer, self._pos = chunk, 0
+        data = self._buffer[self._pos : self._pos + size]
+        self._pos += len(data)
+        return data
+
+    def close(self) -> None:
+        """Stops the background reader."""
+        self._stop.set()
+        self._thread.join()
+
+    def __enter__(self) -> "PrefetchReader":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
 
 
 def first_pass(files: list[str], merged_dir: str, collision_dir: str) -> float:
     """Handles the first pass through the files. Workflow is as follows:
         - The files found in the existing data directory (the files parameter) are looped through.
-        - Each file is streamed using the ijson library.
+        - Each file is streamed through the ijson library while a background thread reads ahead of the parser in bounded chunks.
         - If the collision value is 0, that specific record will be saved in a file in the merged directory with the filename {biomarker_id}.json.
         - If the collision value is 1, that record will be saved in a file in the collision_dir with the filename {biomarker_id}-{counter}.json.
         - If the collision value is 2, that record will be skipped.
@@ -60,14 +133,19 @@ def first_pass(files: list[str], merged_dir: str, collision_dir: str) -> float:
         Seconds elapsed.
     """
 
-    def get_next_available_filename(base_filename: str, directory: str) -> str:
+    # the collision directory is recreated empty before the first pass, so the highest
+    # counter in use for each biomarker id is tracked in memory
+    collision_counters: dict[str, int] = {}
+
+    # hoisted out of the per-record loop so output paths are built with plain string formatting
+    merged_prefix = merged_dir + os.sep
+    collision_prefix = collision_dir + os.sep
+
+    def get_next_available_filename(base_filename: str) -> str:
         """Generates the next available filename by incrementing the counter at the end of the filename."""
-        counter = 0
-        filepath = os.path.join(directory, f"{base_filename}-{counter}.json")
-        while os.path.isfile(filepath):
-            counter += 1
-            filepath = os.path.join(directory, f"{base_filename}-{counter}.json")
-        return filepath
+        counter = collision_counters.get(base_filename, -1) + 1
+        collision_counters[base_filename] = counter
+        return f"{collision_prefix}{base_filename}-{counter}.json"
 
     start_time = time.time()
     total_record_count = 0
@@ -83,40 +161,41 @@ def first_pass(files: list[str], merged_dir: str, collision_dir: str) -> float:
             msg=f"------------- Processing file {file_idx + 1} of {len(files)}: {os.path.basename(file_path)}",
             to_stdout=True,
         )
-        file = open(file_path, "r")
         file_start_time = time.time()
         record_counter = 0
-        for record_idx, record in enumerate(ijson.items(file, "item")):
-            total_record_count += 1
-            if record_idx + 1 % CHECKPOINT_VAL == 0:
-                print(f"Hit checkpoint at record index: {record_idx}.")
-
-            collision = record.pop("collision")
-            biomarker_id = record["biomarker_id"]
-            if "score" in record:
-                _ = record.pop("score")
-            if "score_info" in record:
-                _ = record.pop("score_info")
-
-            if collision == 0:
-                output_path = os.path.join(merged_dir, f"{biomarker_id}.json")
-                if os.path.isfile(output_path):
+        # the disk reads overlap with parsing, but only a few chunks of the file are
+        # held in memory at a time so the records are still streamed
+        with PrefetchReader(file_path) as reader:
+            for record_idx, record in enumerate(ijson.items(reader, "item")):
+                total_record_count += 1
+                if record_idx + 1 % CHECKPOINT_VAL == 0:
+                    print(f"Hit checkpoint at record index: {record_idx}.")
+
+                collision = record.pop("collision")
+                biomarker_id = record["biomarker_id"]
+                if "score" in record:
+                    _ = record.pop("score")
+                if "score_info" in record:
+                    _ = record.pop("score_info")
+
+                if collision == 0:
+                    output_path = f"{merged_prefix}{biomarker_id}.json"
+                    if os.path.isfile(output_path):
+                        raise ValueError(
+                            f"File for {output_path} already exists (idx: {record_idx})."
+                        )
+                    write_json(filepath=output_path, data=record, include_default=True)
+                elif collision == 1:
+                    collision_count += 1
+                    output_path = get_next_available_filename(biomarker_id)
+                    write_json(filepath=output_path, data=record, include_default=True)
+                elif collision == 2:
+                    continue
+                else:
                     raise ValueError(
-                        f"File for {output_path} already exists (idx: {record_idx})."
+                        f"Found invalid collision value: `{collision}` (idx: {record_idx})"
                     )
-                write_json(filepath=output_path, data=record, include_default=True)
-            elif collision == 1:
-                collision_count += 1
-                output_path = get_next_available_filename(biomarker_id, collision_dir)
-                write_json(filepath=output_path, data=record, include_default=True)
-            elif collision == 2:
-                continue
-            else:
-                raise ValueError(
-                    f"Found invalid collision value: `{collision}` (idx: {record_idx})"
-                )
-            record_counter += 1
-        file.close()
+                record_counter += 1
         print(f"Elapsed time: {round(time.time() - file_start_time, 2)} seconds")
         print(f"Records processed: {record_counter}")
     elapsed_time = round(time.time() - start_time)
@@ -196,9 +275,27 @@ def second_pass(merged_dir: str, collision_dir: str) -> float:
     return elapsed_time
 
 
+def remove_directory(path: str) -> None:
+    """Recursively removes a directory and logs how long it took."""
+    rm_time = time.time()
+    shutil.rmtree(path)
+    rm_elapsed = round(time.time() - rm_time, 2)
+    log_msg(
+        logger=LOGGER,
+        msg=f"Finished removing directory {path}, took {rm_elapsed} seconds.",
+        to_stdout=True,
+    )
+
+
 def main() -> None:
 
     parser, _ = standard_parser()
+    parser.add_argument(
+        "-y",
+        "--yes",
+        action="store_true",
+        help="Skip the confirmation prompt for unattended runs.",
+    )
     options = parser.parse_args()
     if not options.server:
         parser.print_help()
@@ -230,46 +327,45 @@ def main() -> None:
     )
     # grab all the files in the existing data directory (latest version of each JSON datamodel formatted data)
     all_data_files = glob.glob(existing_data_pattern)
-    all_data_log_msg = "Found existing files:\n" + "\n\t".join(all_data_files)
-    log_msg(logger=LOGGER, msg=all_data_log_msg, to_stdout=True)
-    get_user_confirmation()
-
     # create the path to the merged data directory
     merged_target_path = os.path.join(
         data_root_path_segment, *generated_path_segment, *merged_data_path_segment
     )
     resolved_symlink = resolve_symlink(merged_target_path)
-    print(f"Resolved symlink for {merged_target_path} points to:\n\t{resolved_symlink}")
-    get_user_confirmation()
-    # create the path to the merged json directory or clear them out if they exist
     # this is where the finalized merged JSON data will go
     merged_target_path_merged = os.path.join(merged_target_path, "merged_json")
-    if os.path.isdir(merged_target_path_merged):
-        rm_command = f"rm -r {merged_target_path_merged}"
-        confirmation_str = f"Found existing directory at {merged_target_path_merged}, going to remove with the following command:"
-        confirmation_str += f"\n\t{rm_command}"
-        print(confirmation_str)
-        get_user_confirmation()
-        rm_time = time.time()
-        subprocess.run(rm_command, shell=True)
-        rm_elapsed = round(time.time() - rm_time, 2)
-        log_msg(logger=LOGGER, msg=f"Finished removing directory, took {rm_elapsed} seconds.", to_stdout=True)
-    os.mkdir(merged_target_path_merged)
-    # create the path to the collision directory or clear them out if they exist
     # this is where the collision value != 0 records will go
     # after the first pass to dump the collision records here, each record will be attempted to be merged with the non-collision record
     # equivalent, if it cannot be, it will remain in this directory
     merged_target_path_collision = os.path.join(merged_target_path, "collision_json")
-    if os.path.isdir(merged_target_path_collision):
-        rm_command = f"rm -r {merged_target_path_collision}"
-        confirmation_str = f"Found existing directory at {merged_target_path_collision}, going to clear with the following command:"
-        confirmation_str += f"\n\t{rm_command}"
-        print(confirmation_str)
+    existing_dirs = [
+        path
+        for path in (merged_target_path_merged, merged_target_path_collision)
+        if os.path.isdir(path)
+    ]
+
+    # build the full plan up front so the run only has to be confirmed once
+    plan_str = "Found existing files:\n\t" + "\n\t".join(all_data_files)
+    plan_str += f"\nResolved symlink for {merged_target_path} points to:\n\t{resolved_symlink}"
+    for path in existing_dirs:
+        plan_str += f"\nFound existing directory at {path}, going to remove it."
+    log_msg(logger=LOGGER, msg=plan_str, to_stdout=True)
+    if not options.yes:
         get_user_confirmation()
-        rm_time = time.time()
-        subprocess.run(rm_command, shell=True)
-        rm_elapsed = round(time.time() - rm_time, 2)
-        log_msg(logger=LOGGER, msg=f"Finished removing directory, took {rm_elapsed} seconds.", to_stdout=True)
+
+    # clear out the merged json and collision directories if they exist, each one is
+    # moved aside first so the (slow) recursive delete can run in the background while
+    # the first pass repopulates the directories
+    removal_threads: list[threading.Thread] = []
+    for path in existing_dirs:
+        removal_path = f"{path}.removing-{int(time.time())}"
+        os.rename(path, removal_path)
+        removal_thread = threading.Thread(
+            target=remove_directory, args=(removal_path,), daemon=False
+        )
+        removal_thread.start()
+        removal_threads.append(removal_thread)
+    os.mkdir(merged_target_path_merged)
     os.mkdir(merged_target_path_collision)
 
     first_pass_time = first_pass(
@@ -280,6 +376,8 @@ def main() -> None:
     second_pass_time = second_pass(
         merged_dir=merged_target_path_merged, collision_dir=merged_target_path_collision
     )
+    for removal_thread in removal_threads:
+        removal_thread.join()
     finish_str = "Finished preprocessing data."
     finish_str += f"\n\tFirst pass took {first_pass_time} seconds."
     finish_str += f"\n\tSecond pass took {second_pass_time} seconds."
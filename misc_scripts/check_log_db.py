@@ -18,11 +18,23 @@ import sys
 import json
 import os
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 from tutils.parser import standard_parser, parse_server
 from tutils.config import get_config
 
+ROW_RULE = "-" * 40
+SQLITE_PRAGMAS = (
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA mmap_size=268435456",
+    "PRAGMA cache_size=-65536",
+)
+
 
 def main():
     parser, server_list = standard_parser()
@@ -50,14 +62,20 @@ def main():
     data_root_path = config_obj["data_path"]
     sqlite_db_path = os.path.join(data_root_path, "log_db", server, "api_logs.db")
 
-    conn = sqlite3.connect(sqlite_db_path)
+    # the script only reads, so open read-only to skip write locking and journal setup
+    conn = sqlite3.connect(
+        f"file:{sqlite_db_path}?mode=ro", uri=True, isolation_level=None
+    )
     cursor = conn.cursor()
+    # read side tuning only, the journal mode is owned by the API that writes to this database
+    for pragma in SQLITE_PRAGMAS:
+        cursor.execute(pragma)
 
     cursor.execute(f"PRAGMA table_info({table})")
     columns = [col[1] for col in cursor.fetchall()]
 
     # get latest rows
-    query = f"SELECT * FROM {table}"
+    query = f"SELECT {', '.join(columns)} FROM {table}"
     if ignore_endpoint:
         query += " WHERE endpoint != ?"
     query += " ORDER BY id DESC LIMIT ?"
@@ -71,18 +89,30 @@ def main():
     rows = reversed(rows)
 
     for idx, row in enumerate(rows):
-        print("-" * 40 + f" Row: {idx} " + "-" * 40)
+        sys.stdout.write(f"{ROW_RULE} Row: {idx} {ROW_RULE}\n")
         row_dict = dict(zip(columns, row))
 
         # Try to parse JSON fields if they exist
         for field in ["request", "data"]:
             if field in row_dict and row_dict[field]:
                 try:
-                    row_dict[field] = json.loads(row_dict[field])
+                    row_dict[field] = (
+                        orjson.loads(row_dict[field])
+                        if orjson is not None
+                        else json.loads(row_dict[field])
+                    )
                 except (json.JSONDecodeError, TypeError):
                     pass
 
-        print(json.dumps(row_dict, indent=2, default=str))
+        # write straight to stdout rather than building an extra copy of the row through print
+        if orjson is not None:
+            sys.stdout.flush()
+            sys.stdout.buffer.write(
+                orjson.dumps(row_dict, option=orjson.OPT_INDENT_2, default=str)
+            )
+        else:
+            json.dump(row_dict, sys.stdout, indent=2, default=str)
+        sys.stdout.write("\n")
 
     conn.close()
 
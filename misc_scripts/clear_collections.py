@@ -14,10 +14,10 @@ options:
 """
 import os
 import sys
+from concurrent.futures import ThreadPoolExecutor
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
-from tutils.db import get_standard_db_handle
-from tutils.config import get_config
+from tutils.db import get_standard_db_handle, get_collections
 from tutils.parser import standard_parser, parse_server
 from tutils.general import get_user_confirmation
 
@@ -58,32 +58,27 @@ def main():
     get_user_confirmation()
 
     dbh = get_standard_db_handle(server)
-    config_obj = get_config()
-    db_name = config_obj["dbinfo"]["dbname"]
-    cache_collection = config_obj["dbinfo"][db_name]["cache_collection"]
-    log_collection = config_obj["dbinfo"][db_name]["req_log_collection"]
-    error_collection = config_obj["dbinfo"][db_name]["error_log_collection"]
-
+    collections = get_collections()
+    targets = []
     if options.cache:
-        try:
-            dbh[cache_collection].delete_many({})
-            print("Cache collection cleared.")
-        except Exception as e:
-            print(f"Error clearing cache collection.\n{e}")
-
+        targets.append(("Cache", collections["cache"]))
     if options.log:
-        try:
-            dbh[log_collection].delete_many({})
-            print("Log collection cleared.")
-        except Exception as e:
-            print(f"Error clearing log collection.\n{e}")
-
+        targets.append(("Log", collections["req_log"]))
     if options.error:
+        targets.append(("Error", collections["error_log"]))
+
+    def clear_collection(label: str, collection: str) -> None:
+        # dropping is a metadata only operation, unlike delete_many which removes every
+        # document one at a time, these collections have no indexes to restore
         try:
-            dbh[error_collection].delete_many({})
-            print("Error collection cleared.")
+            dbh.drop_collection(collection)
+            print(f"{label} collection cleared.")
         except Exception as e:
-            print(f"Error clearing error collection.\n{e}")
+            print(f"Error clearing {label.lower()} collection.\n{e}")
+
+    with ThreadPoolExecutor(max_workers=max(len(targets), 1)) as executor:
+        for label, collection in targets:
+            executor.submit(clear_collection, label, collection)
 
 
 if __name__ == "__main__":
@@ -16,15 +16,10 @@ def main() -> None:
 
     dbh = get_standard_db_handle(server)
 
+    # a single field index can be walked in either direction, so one index per path
+    # covers both sort orders
     paths = ["score", "biomarker_canonical_id"]
     for path in paths:
-        setup_index(
-            collection=dbh["biomarker_collection"],
-            index_field=path,
-            index_name=f"{path}_1",
-            unique=False,
-            order="ascending",
-        )
         setup_index(
             collection=dbh["biomarker_collection"],
             index_field=path,
@@ -5,10 +5,25 @@ creates a concatenated sub field for text indexing.
 """
 
 import pymongo
+from pymongo import UpdateOne
+from bson.codec_options import CodecOptions
+from bson.raw_bson import RawBSONDocument
 import sys
 import argparse
 import json
-from typing import List, Optional
+from typing import List, Optional, Set
+
+# only the fields read by concatenate_fields (plus the existing all_text to skip no-op updates)
+PROJECTION = {
+    "biomarker_id": 1,
+    "biomarker_canonical_id": 1,
+    "biomarker_component": 1,
+    "best_biomarker_role": 1,
+    "condition": 1,
+    "evidence_source": 1,
+    "citation": 1,
+    "all_text": 1,
+}
 
 
 def concatenate_fields(document: dict) -> str:
@@ -25,12 +40,17 @@ def concatenate_fields(document: dict) -> str:
         The concatenated string.
     """
 
+    # keep in sync with load/load_utils.py so both produce the same all_text
     def add_val(value: Optional[str]):
-        if value is not None:
-            value = f"{value.lower().strip()}"
-            if value not in result_str:
-                result_str.append(value)
-
+        if value is None:
+            return
+        value = str(value).strip().lower()
+        if value and value not in seen:
+            seen.add(value)
+            result_str.append(value)
+
+    # the set backs the membership check, the list keeps the insertion order
+    seen: Set[str] = set()
     result_str: List[str] = []
     add_val(document["biomarker_id"])
     add_val(document["biomarker_canonical_id"])
@@ -92,7 +112,8 @@ def main():
         print("Invalid server name. Expects `tst` or `prd`.")
         sys.exit(0)
 
-    config_obj = json.load(open("../api/config.json", "r"))
+    with open("../api/config.json", "r") as f:
+        config_obj = json.load(f)
     port = config_obj["dbinfo"]["port"][server]
     host = f"mongodb://127.0.0.1:{port}"
     db_name = config_obj["dbinfo"]["dbname"]
@@ -115,14 +136,29 @@ def main():
         dbh = client[db_name]
         biomarker_collection = dbh[biomarker_collection_name]
 
-        cursor = biomarker_collection.find()
+        # read through raw BSON documents so fields are only decoded when concatenate_fields touches them
+        raw_collection = biomarker_collection.with_options(
+            codec_options=CodecOptions(document_class=RawBSONDocument)
+        )
+        cursor = raw_collection.find({}, projection=PROJECTION).batch_size(batch_size)
+        ops: List[UpdateOne] = []
         for idx, document in enumerate(cursor):
             if (idx + 1) % batch_size == 0:
                 print(f"Hit log checkpoint on idx {idx}")
             concatenated_string = concatenate_fields(document)
-            biomarker_collection.update_one(
-                {"_id": document["_id"]}, {"$set": {"all_text": concatenated_string}}
+            if concatenated_string == document.get("all_text"):
+                continue
+            ops.append(
+                UpdateOne(
+                    {"_id": document["_id"]},
+                    {"$set": {"all_text": concatenated_string}},
+                )
             )
+            if len(ops) >= batch_size:
+                biomarker_collection.bulk_write(ops, ordered=False)
+                ops.clear()
+        if ops:
+            biomarker_collection.bulk_write(ops, ordered=False)
     except Exception as e:
         print(e)
         sys.exit(1)
@@ -102,7 +102,9 @@ def main():
     misc_fns.setup_logging(f"./logs/remove_data{server}.log")
     logging.info(f"Beginning remove data process: {server}. ####################")
 
-    if process_data(dbh, json.load(open(file_path, "r")), data_collection, file_path):
+    with open(file_path, "r") as f:
+        data = json.load(f)
+    if process_data(dbh, data, data_collection, file_path):
         print("Run successfully.")
         logging.info("Run successfully.")
     else:
@@ -6,6 +6,7 @@ From id/helpers
 """
 
 import logging
+from pymongo import ReplaceOne
 from pymongo.database import Database
 from typing import List, Dict
 
@@ -82,17 +83,19 @@ def process_stats(
             "single_biomarker_count": single_biomarker_count,
             "multicomponent_biomarker_count": multicomponent_biomarker_count,
         }
-        dbh[stat_collection].replace_one(
-            {"_id": "stats"}, {"_id": "stats", **stats}, upsert=True
-        )
-
         entity_type_splits = list(
             dbh[collection].aggregate(ENTITY_TYPE_SPLITS, allowDiskUse=True)
         )
-        dbh[stat_collection].replace_one(
-            {"_id": "entity_type_splits"},
-            {"_id": "entity_type_splits", "splits": entity_type_splits},
-            upsert=True,
+        dbh[stat_collection].bulk_write(
+            [
+                ReplaceOne({"_id": "stats"}, {"_id": "stats", **stats}, upsert=True),
+                ReplaceOne(
+                    {"_id": "entity_type_splits"},
+                    {"_id": "entity_type_splits", "splits": entity_type_splits},
+                    upsert=True,
+                ),
+            ],
+            ordered=False,
         )
 
         logging.info("Statistics calculated successfully.")
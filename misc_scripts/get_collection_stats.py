@@ -11,6 +11,7 @@ options:
 
 import sys
 import os
+from concurrent.futures import ThreadPoolExecutor
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 from tutils.db import get_standard_db_handle, get_collections
@@ -27,13 +28,18 @@ def main():
 
     dbh = get_standard_db_handle(server=server)
 
+    def get_stats(collection: str) -> dict:
+        # collstats already reports the document count from the collection metadata,
+        # avoiding the full collection scan of a separate count_documents call
+        return dbh.command("collstats", collection)
+
     try:
-        for collection in COLLECTION_LIST:
-            collection_handle = dbh[collection]
-            document_count = collection_handle.count_documents({})
-            stats = dbh.command("collstats", collection)
+        # issue the collstats commands concurrently instead of one round trip at a time
+        with ThreadPoolExecutor(max_workers=len(COLLECTION_LIST)) as executor:
+            all_stats = list(executor.map(get_stats, COLLECTION_LIST))
+        for collection, stats in zip(COLLECTION_LIST, all_stats):
             print(f"{collection.upper()} Stats:")
-            print(f"\tNumber of documents: {document_count}")
+            print(f"\tNumber of documents: {stats['count']}")
             print(f"\tCollection size (in bytes): {stats['size']}")
             print(f"\tAverage document size (in bytes): {stats['avgObjSize']}")
             print(f"\tStorage size (in bytes): {stats['storageSize']}")
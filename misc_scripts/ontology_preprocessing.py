@@ -10,6 +10,12 @@ from collections import defaultdict
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 from tutils.general import write_json
 
+IAO_DEFINITION = URIRef("http://purl.obolibrary.org/obo/IAO_0000115")
+OUTPUT_PATH = "./obci.json"
+# shared metadata for tree nodes without any, these are only serialized and never mutated
+MISSING_METADATA = {"definition": None, "synonyms": None, "equivalent_to": None}
+EMPTY_METADATA = {"definition": None, "synonyms": [], "equivalent_to": []}
+
 
 def get_label(g, node):
     """Helper function to get label for a node."""
@@ -33,36 +39,7 @@ def get_property_info(g, prop_uri):
     prop_label = get_label(g, prop_uri)  # Pass the URIRef directly
     return {"id": prop_id, "label": prop_label}
 
-def axiom_to_string(axiom):
-    """Convert an axiom structure to a Protégé-like string representation."""
-    if not axiom:
-        return ""
-
-    if axiom["type"] == "class":
-        return axiom["label"]
-
-    elif axiom["type"] == "intersection":
-        return " and ".join(axiom_to_string(comp) for comp in axiom["components"])
-
-    elif axiom["type"] == "union":
-        return (
-            "("
-            + " or ".join(axiom_to_string(comp) for comp in axiom["components"])
-            + ")"
-        )
-
-    elif axiom["type"] == "restriction":
-        if axiom["restriction_type"] == "some":
-            return (
-                f"{axiom['property']['label']} some {axiom_to_string(axiom['target'])}"
-            )
-        elif axiom["restriction_type"] == "value":
-            return f"{axiom['property']['label']} value '{axiom['target']}'"
-
-    return ""
-
-
-def process_restriction(g, restriction_node):
+def process_restriction(g, restriction_node, cache):
     """Process a restriction node (e.g., 'some' or 'value' restrictions)."""
     property_uri = None
     target = None
@@ -75,7 +52,7 @@ def process_restriction(g, restriction_node):
     # Check for 'some' restriction
     for _, _, target_node in g.triples((restriction_node, OWL.someValuesFrom, None)):
         restriction_type = "some"
-        target = process_class_expression(g, target_node)
+        target = process_class_expression(g, target_node, cache)
 
     # Check for 'value' restriction
     for _, _, target_node in g.triples((restriction_node, OWL.hasValue, None)):
@@ -84,49 +61,76 @@ def process_restriction(g, restriction_node):
 
     property_info = get_property_info(g, property_uri) if property_uri else None
 
+    # Protégé-like string form, built here so the axiom tree isn't walked a second time
+    if restriction_type == "some":
+        axiom_str = f"{property_info['label']} some {target['str']}"
+    elif restriction_type == "value":
+        axiom_str = f"{property_info['label']} value '{target}'"
+    else:
+        axiom_str = ""
+
     return {
         "type": "restriction",
         "restriction_type": restriction_type,
         "property": property_info,
         "target": target,
+        "str": axiom_str,
     }
 
 
-def process_class_expression(g, node):
-    """Process a class expression (class, union, intersection, or restriction)."""
+def process_class_expression(g, node, cache):
+    """Process a class expression (class, union, intersection, or restriction).
+
+    Each processed expression carries its Protégé-like string representation under
+    "str". Results are memoized in cache by node since the same class references and
+    expressions recur across many equivalence axioms.
+    """
+    if node in cache:
+        return cache[node]
+    cache[node] = result = _process_class_expression(g, node, cache)
+    return result
+
+
+def _process_class_expression(g, node, cache):
     if isinstance(node, BNode):
         # Check for union
         for _, _, union_list in g.triples((node, OWL.unionOf, None)):
+            components = [
+                process_class_expression(g, item, cache)
+                for item in g.items(union_list)
+            ]
             return {
                 "type": "union",
-                "components": [
-                    process_class_expression(g, item) for item in g.items(union_list)
-                ],
+                "components": components,
+                "str": "(" + " or ".join(comp["str"] for comp in components) + ")",
             }
 
         # Check for intersection
         for _, _, intersection_list in g.triples((node, OWL.intersectionOf, None)):
+            components = [
+                process_class_expression(g, item, cache)
+                for item in g.items(intersection_list)
+            ]
             return {
                 "type": "intersection",
-                "components": [
-                    process_class_expression(g, item)
-                    for item in g.items(intersection_list)
-                ],
+                "components": components,
+                "str": " and ".join(comp["str"] for comp in components),
             }
 
         # Must be a restriction
-        return process_restriction(g, node)
+        return process_restriction(g, node, cache)
     else:
         # Direct class reference - node is already a URIRef
-        return {"type": "class", "label": get_label(g, node)}
+        label = get_label(g, node)
+        return {"type": "class", "label": label, "str": label}
 
 
-def process_equivalence_axiom(g, class_node):
+def process_equivalence_axiom(g, class_node, cache):
     """Process equivalence axioms for a given class."""
     equivalences = []
 
     for s, p, o in g.triples((class_node, OWL.equivalentClass, None)):
-        equivalences.append(process_class_expression(g, o))
+        equivalences.append(process_class_expression(g, o, cache))
 
     return equivalences
 
@@ -137,68 +141,100 @@ def process_owl_to_tree(path: str) -> list:
     child_parent = defaultdict(list)
     node_metadata = {}
 
-    # Get all subclass relationships
-    for s, p, o in g.triples((None, RDFS.subClassOf, None)):
-        if isinstance(s, BNode) or isinstance(o, BNode):
-            continue
-        child = str(s)
-        parent = str(o)
-        child_parent[parent].append(child)
-
-    # Get metadata for each class
-    for s in g.subjects(RDF.type, OWL.Class):
-        if isinstance(s, BNode):
-            continue
-        class_uri = str(s)
-
-        # Get label
-        label = None
-        for o in g.objects(s, RDFS.label):
-            label = str(o)
-            break
-
-        # Get definition
-        definition = None
-        for o in g.objects(s, URIRef("http://purl.obolibrary.org/obo/IAO_0000115")):
-            definition = str(o)
-            break
-
-        # Get synonyms
-        synonyms = []
-        for p, o in g.predicate_objects(s):
-            if "synonym" in str(p):
-                synonyms.append(str(o))
+    # Index the subclass relationships, classes, labels, definitions, and synonyms in a
+    # single walk over the graph instead of a separate scan for each
+    classes = []
+    labels = {}
+    definitions = {}
+    synonyms = defaultdict(list)
+    # whether each predicate seen is a synonym predicate, checked once per predicate
+    is_synonym_predicate = {}
+    for s, p, o in g:
+        if p == RDFS.subClassOf:
+            if isinstance(s, BNode) or isinstance(o, BNode):
+                continue
+            # the same URIs recur across many edges, intern them so each is stored once
+            child_parent[sys.intern(str(o))].append(sys.intern(str(s)))
+        elif p == RDF.type:
+            if o == OWL.Class and not isinstance(s, BNode):
+                classes.append(s)
+        elif p == RDFS.label:
+            labels.setdefault(s, sys.intern(str(o)))
+        elif p == IAO_DEFINITION:
+            definitions.setdefault(s, str(o))
+        else:
+            if p not in is_synonym_predicate:
+                is_synonym_predicate[p] = "synonym" in str(p)
+            if is_synonym_predicate[p]:
+                synonyms[s].append(str(o))
+
+    # Get metadata for each class, sharing processed class expressions across classes
+    expression_cache = {}
+    for s in classes:
+        class_uri = sys.intern(str(s))
 
         # Get equivalence axioms
-        equivalences = process_equivalence_axiom(g, s)
+        equivalences = process_equivalence_axiom(g, s, expression_cache)
 
         node_metadata[class_uri] = {
             "id": class_uri.split("/")[-1],
-            "label": label,
-            "definition": definition,
-            "synonyms": synonyms,
-            "equivalent_to": [axiom_to_string(axiom) for axiom in equivalences],
+            "label": labels.get(s),
+            "definition": definitions.get(s),
+            "synonyms": synonyms.get(s, []),
+            "equivalent_to": [axiom["str"] for axiom in equivalences],
         }
 
-    def build_tree(node):
-        children = child_parent.get(node, [])
-        node_data = node_metadata.get(node, {})
-        return {
-            "id": node_data.get("id"),
-            "label": node_data.get("label"),
-            "metadata": {
-                "definition": node_data.get("definition"),
-                "synonyms": node_data.get("synonyms"),
-                "equivalent_to": node_data.get("equivalent_to"),
-            },
-            "children": [build_tree(child) for child in children],
-        }
+    built = {}
+
+    def build_tree(root):
+        """Builds the subtree under root bottom up with an explicit post-order traversal,
+        avoiding the recursion limit on deep hierarchies. Edges back to an ancestor are
+        dropped so accidental cycles can't loop forever."""
+        ancestors = set()
+        stack = [(root, False)]
+        while stack:
+            node, expanded = stack.pop()
+            if node in built:
+                continue
+            children = child_parent.get(node, [])
+            if not expanded:
+                ancestors.add(node)
+                stack.append((node, True))
+                for child in children:
+                    if child not in built and child not in ancestors:
+                        stack.append((child, False))
+                continue
+            ancestors.discard(node)
+            node_data = node_metadata.get(node, {})
+            if not node_data:
+                metadata = MISSING_METADATA
+            elif (
+                node_data["definition"] is None
+                and not node_data["synonyms"]
+                and not node_data["equivalent_to"]
+            ):
+                metadata = EMPTY_METADATA
+            else:
+                metadata = {
+                    "definition": node_data["definition"],
+                    "synonyms": node_data["synonyms"],
+                    "equivalent_to": node_data["equivalent_to"],
+                }
+            built[node] = {
+                "id": node_data.get("id"),
+                "label": node_data.get("label"),
+                "metadata": metadata,
+                "children": [built[child] for child in children if child in built],
+            }
+        return built[root]
 
     # Find root nodes (nodes without parents)
-    all_children = set(
-        [child for children in child_parent.values() for child in children]
-    )
-    root_nodes = [node for node in child_parent.keys() if node not in all_children]
+    all_children = set()
+    for children in child_parent.values():
+        all_children.update(children)
+    # keep the roots in insertion order (a dict_keys set difference would make the
+    # order of the top level of the output vary between runs)
+    root_nodes = [node for node in child_parent if node not in all_children]
 
     # Build tree starting from root nodes
     tree = [build_tree(root) for root in root_nodes]
@@ -211,7 +247,7 @@ def main() -> None:
     options = parser.parse_args()
     ontology_fp = options.owl_path
     tree = process_owl_to_tree(path=ontology_fp)
-    write_json("./obci.json", tree)
+    write_json(OUTPUT_PATH, tree)
 
 
 if __name__ == "__main__":
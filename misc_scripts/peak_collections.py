@@ -3,7 +3,7 @@
 usage: parser.py [-h] [--biomarker_collection] [--canonical_id_map_collection]
                  [--second_id_map_collection] [--unreviewed_collection] 
                  [--request_log_collection] [--error_log_collection] [--search_cache] 
-                 [-n NUM] server
+                 [-n NUM] [-f FIELDS] [--full] [--repl] server
 
 positional arguments:
   server                prd/beta/tst/dev
@@ -18,16 +18,113 @@ options:
   --error_log_collection            Store true argument for the error log collection.
   --search_cache                    Store true argument for the search cache collection.
   -n NUM, --num NUM
+  -f FIELDS, --fields FIELDS        Comma separated list of fields to return, returns the full entries if not specified.
+  --full                            Return the full entries for collections that default to a summary projection.
+  --repl                            Read `<collection> [num]` lines from stdin over a single connection.
 """
 
 import sys
 import os
+from typing import Optional
+from pymongo.database import Database
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 from tutils.db import get_standard_db_handle, get_collections
 from tutils.parser import standard_parser, parse_server
+from tutils.constants import biomarker_default
 
 COLLECTION_LIST = list(get_collections().values())
+# summary fields to peek at for collections whose entries are too large to print in full
+PEEK_PROJECTIONS: dict[str, dict[str, int]] = {
+    biomarker_default(): {
+        "biomarker_id": 1,
+        "biomarker_canonical_id": 1,
+        "biomarker_component.biomarker": 1,
+        "condition.recommended_name.name": 1,
+    }
+}
+
+
+def peek(
+    dbh: Database,
+    target_collection: str,
+    num: int,
+    fields: Optional[str] = None,
+    full: bool = False,
+) -> None:
+    """Prints the last entries of a collection.
+
+    Parameters
+    ----------
+    dbh: Database
+        The database handle.
+    target_collection: str
+        The collection to peek into.
+    num: int
+        The number of entries to print.
+    fields: str or None, optional
+        Comma separated list of fields to return.
+    full: bool, optional
+        Whether to skip the default summary projection.
+    """
+    # grab the last n entries and put them back in insertion order server side, $limit
+    # rejects values below 1 so keep the cursor.limit() semantics by hand: a num of 0
+    # returns every entry and a negative num is treated as its absolute value
+    num = abs(num)
+    pipeline: list[dict] = (
+        [{"$sort": {"_id": -1}}, {"$limit": num}, {"$sort": {"_id": 1}}]
+        if num
+        else [{"$sort": {"_id": 1}}]
+    )
+    aggregate_options = {"batchSize": num} if num else {}
+    if fields:
+        pipeline.append({"$project": {field: 1 for field in fields.split(",")}})
+    elif not full and target_collection in PEEK_PROJECTIONS:
+        pipeline.append({"$project": PEEK_PROJECTIONS[target_collection]})
+        print("(projected view, use --full for the raw documents)\n")
+    last_entries = dbh[target_collection].aggregate(pipeline, **aggregate_options)
+
+    for idx, entry in enumerate(last_entries):
+        print(f"Entry: {idx + 1}:\n{entry}\n")
+
+
+def repl(
+    dbh: Database, num: int, fields: Optional[str] = None, full: bool = False
+) -> None:
+    """Reads `<collection> [num]` lines from stdin and peeks into each one, reusing the
+    same connection for every line.
+
+    Parameters
+    ----------
+    dbh: Database
+        The database handle.
+    num: int
+        The number of entries to print when a line doesn't specify one.
+    fields: str or None, optional
+        Comma separated list of fields to return.
+    full: bool, optional
+        Whether to skip the default summary projection.
+    """
+    usage_str = (
+        f"Expected `<collection> [num]` with one of: {', '.join(COLLECTION_LIST)}"
+    )
+    for line in sys.stdin:
+        args = line.split()
+        if not args:
+            continue
+        if args[0] not in COLLECTION_LIST or len(args) > 2:
+            print(usage_str)
+            continue
+        try:
+            peek(
+                dbh=dbh,
+                target_collection=args[0],
+                num=int(args[1]) if len(args) == 2 else num,
+                fields=fields,
+                full=full,
+            )
+        except Exception as e:
+            print(e)
 
 
 def main():
@@ -45,18 +142,40 @@ def main():
             help=help_str,
         )
     parser.add_argument("-n", "--num", type=int, default=5)
+    parser.add_argument(
+        "-f",
+        "--fields",
+        type=str,
+        default=None,
+        help="Comma separated list of fields to return, returns the full entries if not specified.",
+    )
+    parser.add_argument(
+        "--full",
+        action="store_true",
+        help="Return the full entries for collections that default to a summary projection.",
+    )
+    parser.add_argument(
+        "--repl",
+        action="store_true",
+        help="Read `<collection> [num]` lines from stdin over a single connection.",
+    )
     options = parser.parse_args()
     server = parse_server(parser=parser, server=options.server, server_list=server_list)
 
-    option_dict = options.__dict__
-    option_list = [val for val in option_dict.values() if isinstance(val, bool)]
-    if not any(option_list):
+    if options.repl:
+        dbh = get_standard_db_handle(server=server)
+        repl(dbh=dbh, num=options.num, fields=options.fields, full=options.full)
+        return
+
+    selected = [
+        collection for collection in COLLECTION_LIST if getattr(options, collection)
+    ]
+    if not selected:
         print("Need to specify one collection.")
         parser.print_help()
         sys.exit(0)
 
-    true_list = [x for x in option_list if x]
-    if len(true_list) > 1:
+    if len(selected) > 1:
         print("Too many collections passed, can only use one at a time.")
         parser.print_help()
         sys.exit(0)
@@ -64,16 +183,13 @@ def main():
     dbh = get_standard_db_handle(server=server)
 
     try:
-        target_collection_idx = option_list.index(True)
-        target_collection = COLLECTION_LIST[target_collection_idx]
-        collection = dbh[target_collection]
-
-        last_entries = collection.find().sort("_id", -1).limit(options.num)
-        last_entries_list = list(last_entries)
-        last_entries_list.reverse()
-
-        for idx, entry in enumerate(last_entries_list):
-            print(f"Entry: {idx + 1}:\n{entry}\n")
+        peek(
+            dbh=dbh,
+            target_collection=selected[0],
+            num=options.num,
+            fields=options.fields,
+            full=options.full,
+        )
     except Exception as e:
         print(e)
         sys.exit(1)
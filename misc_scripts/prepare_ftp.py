@@ -1,24 +1,181 @@
 import sys
 import os
-import glob
 import subprocess
+import shutil
+import time
+from typing import Iterator
+from concurrent.futures import ThreadPoolExecutor
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 from tutils.config import get_config
 from tutils.parser import standard_parser, parse_server
-from tutils.general import copy_file, resolve_symlink, get_user_confirmation
+from tutils.general import resolve_symlink, get_user_confirmation
+from tutils.logging import setup_logging, log_msg, LOGS_DIR
+
+LOGGER = setup_logging("prepare_ftp.log")
 
 ALL_BIOMARKER_JSON = "all-biomarker-json"
 ALL_BIOMARKER_TSV = "all-biomarker-tsv"
 ALL_BIOMARKER_JSON_MERGED = "all-biomarker-json-merged"
 
 TAR_EXT = ".tar.gz"
-TAR_CMD = "tar -czvf"
+TAR_CMD = ["tar", "-c"]
+RSYNC_CMD = ["rsync", "-a", "--from0", "--files-from=-"]
+
+
+def get_tar_cmd(threads: int, verbose: bool = False) -> list[str]:
+    """Builds the tar command, compressing with pigz (parallel gzip) when it is installed
+    and falling back to single threaded gzip otherwise. The output is a standard gzip
+    stream either way.
+
+    Parameters
+    ----------
+    threads: int
+        The number of compression threads for pigz.
+    verbose: bool, optional
+        Whether tar should list the archived files.
+
+    Returns
+    -------
+    list[str]
+        The tar command, to be followed by the tarball path.
+    """
+    compress_program = f"pigz -p {threads}" if shutil.which("pigz") else "gzip"
+    tar_cmd = [*TAR_CMD, f"--use-compress-program={compress_program}"]
+    if verbose:
+        tar_cmd.append("-v")
+    tar_cmd.append("-f")
+    return tar_cmd
+
+
+def iter_source_files(src_glob_pattern: str) -> Iterator[str]:
+    """Lazily yields the names of the files matching a flat `<dir>/*.<ext>` pattern.
+
+    Parameters
+    ----------
+    src_glob_pattern: str
+        The source glob pattern from the data config.
+
+    Yields
+    ------
+    str
+        The matching file names, relative to the pattern's directory.
+    """
+    # a single scandir pass avoids the per entry fnmatch of glob and lets the names
+    # stream to the consumers as the directory is read
+    src_dir, name_pattern = os.path.split(src_glob_pattern)
+    extension = name_pattern.lstrip("*")
+    with os.scandir(src_dir) as entries:
+        for entry in entries:
+            # glob skips dotfiles, keep that behavior
+            if (
+                not entry.name.startswith(".")
+                and entry.name.endswith(extension)
+                and entry.is_file()
+            ):
+                yield entry.name
+
+
+def prepare_data_type(
+    data_type: str, metadata: dict[str, str], tar_cmd: list[str]
+) -> None:
+    """Copies the source files for a data type into its FTP directory and creates the
+    tarball straight from the source files.
+
+    Parameters
+    ----------
+    data_type: str
+        The data type being prepared (json, tsv, or merged).
+    metadata: dict[str, str]
+        The data config entry for the data type.
+    tar_cmd: list[str]
+        The tar command from get_tar_cmd.
+    """
+    start_time = time.time()
+    log_msg(logger=LOGGER, msg=f"Preparing {data_type} data.", to_stdout=True)
+    src_dir = os.path.dirname(metadata["src_glob_pattern"])
+    # the data types run concurrently, give each tar its own log file so the file
+    # listings (with --verbose) and any warnings don't interleave on stdout
+    tar_log_path = f"{LOGS_DIR}/prepare_ftp_{data_type}_tar.log"
+    # tar reads the file list from stdin relative to the source directory, the member
+    # names are prefixed with the FTP directory path so the archive layout is the same
+    # as when the staged copy was archived
+    member_prefix = metadata["dest_path"].lstrip("/")
+
+    processes: list[subprocess.Popen] = []
+    with open(tar_log_path, "w") as tar_log:
+        # the merged data is only published as a tarball, so it isn't staged at all
+        if data_type != "merged":
+            if not os.path.isdir(metadata["dest_path"]):
+                os.mkdir(metadata["dest_path"])
+            # a single rsync per data type instead of a cp process per file, files
+            # that are unchanged since the last run are skipped. the files are copied
+            # rather than hardlinked, the source files are rewritten in place by the
+            # next release cycle and the published copies have to stay as they are
+            processes.append(
+                subprocess.Popen(
+                    [
+                        *RSYNC_CMD,
+                        f"{src_dir}/",
+                        f"{metadata['dest_path']}/",
+                    ],
+                    stdin=subprocess.PIPE,
+                )
+            )
+        processes.append(
+            subprocess.Popen(
+                [
+                    *tar_cmd,
+                    metadata["tarball"],
+                    "-C",
+                    src_dir,
+                    f"--transform=s,^,{member_prefix}/,",
+                    "--null",
+                    "-T",
+                    "-",
+                ],
+                stdin=subprocess.PIPE,
+                stdout=tar_log,
+                stderr=subprocess.STDOUT,
+            )
+        )
+        # stream the NUL delimited names to rsync and tar as the directory is read
+        file_count = 0
+        for file_name in iter_source_files(metadata["src_glob_pattern"]):
+            file_name_bytes = os.fsencode(file_name) + b"\0"
+            for process in processes:
+                process.stdin.write(file_name_bytes)  # type: ignore
+            file_count += 1
+        for process in processes:
+            process.stdin.close()  # type: ignore
+        for process in processes:
+            if process.wait() != 0:
+                raise subprocess.CalledProcessError(process.returncode, process.args)
+
+    elapsed_time = round(time.time() - start_time, 2)
+    log_msg(
+        logger=LOGGER,
+        msg=f"Finished {data_type} data, {file_count} files in {elapsed_time} seconds (tar log: {tar_log_path}).",
+        to_stdout=True,
+    )
 
 
 def main() -> None:
 
     parser, server_list = standard_parser()
+    parser.add_argument(
+        "-t",
+        "--threads",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="Compression threads per tarball when pigz is available.",
+    )
+    parser.add_argument(
+        "-v",
+        "--verbose",
+        action="store_true",
+        help="Log the archived files for each tarball.",
+    )
     options = parser.parse_args()
     server = parse_server(parser=parser, server=options.server, server_list=server_list)
     if server != "prd":
@@ -72,17 +229,15 @@ def main() -> None:
     print(confirmation_str)
     get_user_confirmation()
 
-    for data_type, metadata in data_config.items():
-        if not os.path.isdir(metadata["dest_path"]):
-            os.mkdir(metadata["dest_path"])
-        files_to_copy = glob.glob(metadata["src_glob_pattern"])
-        for fp in files_to_copy:
-            copy_file(src=fp, dest=metadata["dest_path"])
-        subprocess.run(
-            f"{TAR_CMD} {metadata['tarball']} {metadata['dest_path']}", shell=True
-        )
-        if data_type == "merged":
-            subprocess.run(f"rm -r {metadata['dest_path']}", shell=True)
+    tar_cmd = get_tar_cmd(threads=options.threads, verbose=options.verbose)
+    # the data types read from and write to disjoint paths so they can be prepared concurrently
+    with ThreadPoolExecutor(max_workers=len(data_config)) as executor:
+        futures = [
+            executor.submit(prepare_data_type, data_type, metadata, tar_cmd)
+            for data_type, metadata in data_config.items()
+        ]
+    for future in futures:
+        future.result()
 
 
 if __name__ == "__main__":
@@ -1,5 +1,5 @@
 """Maps score values from the biomarker score calculator command line tool to the data model JSON
-files.
+files. Files ending in `.jsonl` are handled as newline delimited JSON (one entry per line).
 
 Usage: map_scores.py [options]
 
@@ -9,16 +9,22 @@ Usage: map_scores.py [options]
 """
 
 import argparse
+import ijson
 import json
 import glob
 import sys
 import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from typing import Iterable, TextIO
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 from tutils.general import load_json_type_safe
 from tutils.logging import setup_logging, log_msg
 
 LOGGER = setup_logging("map_scores.log")
+IO_BUFFER_SIZE = 1 << 20
+JSONL_EXT = ".jsonl"
 
 
 def update_biomarker_files(glob_pattern: str, score_map_path: str):
@@ -31,10 +37,22 @@ def update_biomarker_files(glob_pattern: str, score_map_path: str):
     score_map_path : str
         The path to the score map file.
     """
+    # glob once and index the files by name, the first file found for a name wins
+    basename_map: dict[str, str] = {}
+    for fp in glob.glob(glob_pattern):
+        filename = os.path.basename(fp)
+        if filename in basename_map:
+            log_msg(
+                logger=LOGGER,
+                msg=f"Duplicate file found for file name: {filename}. Skipping duplicate...",
+                level="warning",
+                to_stdout=True,
+            )
+            continue
+        basename_map[filename] = fp
+
     # make sure glob pattern is valid
-    processed_files: set[str] = set()
-    glob_files = set([os.path.basename(file) for file in glob.glob(glob_pattern)])
-    if not glob_files:
+    if not basename_map:
         log_msg(
             logger=LOGGER,
             msg="Error: glob pattern picked up zero files. Check glob pattern.",
@@ -44,13 +62,15 @@ def update_biomarker_files(glob_pattern: str, score_map_path: str):
         sys.exit(1)
 
     # load score map
-    score_map = load_json_type_safe(filepath=score_map_path, return_type="dict")
-    score_map_files = set(score_map.keys())
+    score_map = _load_score_map(score_map_path, os.path.getmtime(score_map_path))
 
-    if glob_files != score_map_files:
+    # the key views support set algebra, so only the mismatched names are materialized
+    mismatched_files = basename_map.keys() ^ score_map.keys()
+    if mismatched_files:
         log_str = "Warning: glob files picked up do not match all keys listed in score map keys."
-        log_str += f"\nglob files: {glob_files}"
-        log_str += f"\nscore map files: {score_map_files}"
+        log_str += (
+            f"\nfiles only in the glob or only in the score map: {mismatched_files}"
+        )
         log_msg(
             logger=LOGGER,
             msg=log_str,
@@ -59,19 +79,8 @@ def update_biomarker_files(glob_pattern: str, score_map_path: str):
         )
 
     # work through data files
-    for fp in glob.glob(glob_pattern):
-
-        filename = os.path.basename(fp)
-        if filename in processed_files:
-            log_msg(
-                logger=LOGGER,
-                msg=f"Duplicate file found for file name: {filename}. Skipping duplicate...",
-                level="warning",
-                to_stdout=True,
-            )
-            continue
-        processed_files.add(filename)
-
+    files_to_map: list[tuple[str, dict]] = []
+    for filename, fp in basename_map.items():
         if filename not in score_map:
             log_msg(
                 logger=LOGGER,
@@ -80,35 +89,187 @@ def update_biomarker_files(glob_pattern: str, score_map_path: str):
                 to_stdout=True,
             )
             continue
-        scores = score_map[filename]
+        files_to_map.append((fp, score_map[filename]))
 
-        biomarker_data = load_json_type_safe(filepath=fp, return_type="list")
-        for idx, biomarker in enumerate(biomarker_data):
-            biomarker_id = biomarker.get("biomarker_id", None)
-            if biomarker_id is None:
-                log_msg(
-                    logger=LOGGER,
-                    msg=f"Error on index {idx} of file {filename}. No biomarker_id found. Skipping... \nEntry: {biomarker}",
-                    level="error",
-                    to_stdout=True,
+    # each file is parsed, mapped, and serialized independently so spread the
+    # (CPU bound) files across processes
+    max_workers = max(1, min(len(files_to_map), os.cpu_count() or 1))
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        futures = [
+            executor.submit(_map_file_scores, fp, scores) for fp, scores in files_to_map
+        ]
+    for future in futures:
+        future.result()
+
+
+@lru_cache(maxsize=4)
+def _load_score_map(score_map_path: str, mtime: float) -> dict:
+    """Loads a score map, cached on the path and modification time so repeated library
+    calls don't re-read an unchanged score map. Treat the returned dict as read only."""
+    return load_json_type_safe(filepath=score_map_path, return_type="dict")
+
+
+def _map_file_scores(fp: str, scores: dict) -> None:
+    """Maps the scores for a single data model file, run in a worker process.
+
+    Parameters
+    ----------
+    fp : str
+        The path to the data model file.
+    scores : dict
+        The score map entries for the file.
+    """
+    filename = os.path.basename(fp)
+    # JSONL files are read and written one entry per line, otherwise the entries of the
+    # JSON array are streamed and written back in the indented array layout
+    is_jsonl = fp.endswith(JSONL_EXT)
+    # a file without a single mappable entry is left untouched, check for one before
+    # paying for the full serialization and rewrite
+    if not _has_mappable_entries(fp, scores, is_jsonl):
+        log_msg(
+            logger=LOGGER,
+            msg=f"No scores mapped for file {filename}, skipping rewrite.",
+            level="warning",
+            to_stdout=True,
+        )
+        return
+    # stream the entries through one at a time instead of loading the whole file,
+    # the output is written to a temp file that replaces the original when done
+    tmp_fp = f"{fp}.tmp"
+    with open(fp, "rb", buffering=IO_BUFFER_SIZE) as infile, open(
+        tmp_fp, "w", buffering=IO_BUFFER_SIZE
+    ) as outfile:
+        if is_jsonl:
+            entries = (json.loads(line) for line in infile if line.strip())
+            skipped_count = _write_mapped_entries(
+                entries, outfile, scores, filename, is_jsonl
+            )
+        else:
+            entries = ijson.items(
+                infile, "item", buf_size=IO_BUFFER_SIZE, use_float=True
+            )
+            try:
+                skipped_count = _write_mapped_entries(
+                    entries, outfile, scores, filename, is_jsonl
                 )
-                continue
-            if biomarker_id not in scores:
+            except ijson.IncompleteJSONError as e:
+                # the C backend can't represent integers wider than 64 bits with
+                # use_float, redo the file with the standard library parser (which a
+                # genuinely malformed file will still fail in)
                 log_msg(
                     logger=LOGGER,
-                    msg=f"Biomarker ID {biomarker_id}, index: {idx} in file {filename} not found in score map. skipping...",
-                    level="error",
-                    to_stdout=True,
+                    msg=f"Streaming parse failed for file {filename} ({e}), falling back to json.load.",
+                    level="warning",
                 )
-                continue
-            biomarker["score"] = scores[biomarker_id]["score"]
-            biomarker["score_info"] = scores[biomarker_id]["score_info"]
+                infile.seek(0)
+                outfile.seek(0)
+                outfile.truncate()
+                skipped_count = _write_mapped_entries(
+                    json.load(infile), outfile, scores, filename, is_jsonl
+                )
+    os.replace(tmp_fp, fp)
+    msg = f"Successfully mapped file {filename}."
+    if skipped_count:
+        msg += f" Skipped {skipped_count} entries, see map_scores.log for details."
+    log_msg(logger=LOGGER, msg=msg, to_stdout=True)
 
-        with open(fp, "w") as outfile:
-            json.dump(biomarker_data, outfile, indent=4)
-        log_msg(
-            logger=LOGGER, msg=f"Successfully mapped file {filename}.", to_stdout=True
-        )
+
+def _write_mapped_entries(
+    entries: Iterable[dict],
+    outfile: TextIO,
+    scores: dict,
+    filename: str,
+    is_jsonl: bool,
+) -> int:
+    """Maps the scores onto the entries and writes them out in the file's layout.
+
+    Parameters
+    ----------
+    entries : Iterable[dict]
+        The data model entries.
+    outfile : TextIO
+        The (temp) output file.
+    scores : dict
+        The score map entries for the file.
+    filename : str
+        The name of the data model file, for the log messages.
+    is_jsonl : bool
+        Whether to write newline delimited JSON instead of an indented JSON array.
+
+    Returns
+    -------
+    int
+        The number of entries that were skipped.
+    """
+    if not is_jsonl:
+        outfile.write("[")
+    # the per entry errors only go to the log file, stdout gets a per file count
+    skipped_count = 0
+    idx = -1
+    for idx, biomarker in enumerate(entries):
+        biomarker_id = biomarker.get("biomarker_id", None)
+        score_entry = scores.get(biomarker_id)
+        if biomarker_id is None:
+            # lazy %-formatting, the entry is only stringified if the record is emitted
+            log_msg(
+                logger=LOGGER,
+                msg="Error on index %s of file %s. No biomarker_id found. Skipping... \nEntry: %s",
+                level="error",
+                args=(idx, filename, biomarker),
+            )
+            skipped_count += 1
+        elif score_entry is None:
+            log_msg(
+                logger=LOGGER,
+                msg="Biomarker ID %s, index: %s in file %s not found in score map. skipping...",
+                level="error",
+                args=(biomarker_id, idx, filename),
+            )
+            skipped_count += 1
+        else:
+            biomarker["score"] = score_entry["score"]
+            biomarker["score_info"] = score_entry["score_info"]
+        if is_jsonl:
+            outfile.write(json.dumps(biomarker))
+            outfile.write("\n")
+        else:
+            # matches the layout of dumping the full list with an indent of 4
+            outfile.write(",\n    " if idx else "\n    ")
+            outfile.write(json.dumps(biomarker, indent=4).replace("\n", "\n    "))
+    if not is_jsonl:
+        outfile.write("\n]" if idx >= 0 else "]")
+    return skipped_count
+
+
+def _has_mappable_entries(fp: str, scores: dict, is_jsonl: bool) -> bool:
+    """Checks whether any entry in a data model file has a biomarker ID in the score
+    map, stopping at the first one found.
+
+    Parameters
+    ----------
+    fp : str
+        The path to the data model file.
+    scores : dict
+        The score map entries for the file.
+    is_jsonl : bool
+        Whether the file is newline delimited JSON.
+
+    Returns
+    -------
+    bool
+        Whether at least one entry would have a score mapped.
+    """
+    with open(fp, "rb", buffering=IO_BUFFER_SIZE) as infile:
+        if is_jsonl:
+            biomarker_ids = (
+                json.loads(line).get("biomarker_id") for line in infile if line.strip()
+            )
+        else:
+            # only the IDs are pulled out of the stream, the entries aren't built
+            biomarker_ids = ijson.items(
+                infile, "item.biomarker_id", buf_size=IO_BUFFER_SIZE
+            )
+        return any(biomarker_id in scores for biomarker_id in biomarker_ids)
 
 
 def main():
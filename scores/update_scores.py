@@ -3,18 +3,27 @@
 
 import argparse
 from pymongo.collection import Collection
+from pymongo import UpdateOne
 import sys
 import os
 import glob
+from concurrent.futures import ThreadPoolExecutor
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
-from tutils.general import load_json_type_safe
+from tutils.general import load_json_type_safe, iter_jsonl
 from tutils.logging import setup_logging, log_msg
 from tutils.parser import standard_parser, parse_server
-from tutils.db import get_standard_db_handle
-from tutils.config import get_config
+from tutils.db import (
+    get_standard_db_handle,
+    setup_index,
+    bulk_collection,
+    DatabaseError,
+)
+from tutils.constants import biomarker_default
 
 LOGGER = setup_logging("update_scores.log")
+WRITE_BATCH_SIZE = 1_000
+MAX_WORKERS = 8
 
 
 def update_scores(file_list: list[str], collection_handle: Collection) -> bool:
@@ -32,35 +41,66 @@ def update_scores(file_list: list[str], collection_handle: Collection) -> bool:
     bool
         True on success, False on failure.
     """
-    for fp in file_list:
-        log_msg(logger=LOGGER, msg=f"Starting processing file: {fp}", to_stdout=True)
-        data = load_json_type_safe(filepath=fp, return_type="list")
-        for document in data:
-            collision_status = document.pop("collision")
-            if collision_status != 0:
-                continue
-            update_result = collection_handle.update_one(
-                {"biomarker_id": document["biomarker_id"]},
-                {
-                    "$set": {
-                        "score": document["score"],
-                        "score_info": document["score_info"],
-                    }
-                },
+    # the files are independent and the work is mostly waiting on MongoDB, so update
+    # them concurrently over the (thread safe) shared client
+    max_workers = max(1, min(len(file_list), MAX_WORKERS))
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [
+            executor.submit(_update_file_scores, fp, collection_handle)
+            for fp in file_list
+        ]
+    return all(future.result() for future in futures)
+
+
+def _update_file_scores(fp: str, collection_handle: Collection) -> bool:
+    """Updates the scores for a single file, returns False on failure."""
+    log_msg(logger=LOGGER, msg=f"Starting processing file: {fp}", to_stdout=True)
+    # newline delimited JSON files are streamed an entry at a time
+    data = (
+        iter_jsonl(filepath=fp)
+        if fp.endswith(".jsonl")
+        else load_json_type_safe(filepath=fp, return_type="list")
+    )
+    ops: list[UpdateOne] = []
+    for document in data:
+        # the documents are only read, so check the collision value in place
+        if document["collision"] != 0:
+            continue
+        biomarker_id = document["biomarker_id"]
+        score = document["score"]
+        score_info = document["score_info"]
+        ops.append(
+            UpdateOne(
+                {"biomarker_id": biomarker_id},
+                {"$set": {"score": score, "score_info": score_info}},
             )
-            if update_result.modified_count != 1:
-                log_str = (
-                    f"Error updating entry for biomarker ID {document['biomarker_id']}"
-                )
-                log_str += f"\nModified count: {update_result.modified_count}"
-                log_str += f"\nEntry: {document}"
-                log_msg(logger=LOGGER, msg=log_str, level="error", to_stdout=True)
-                return False
-        log_msg(
-            logger=LOGGER,
-            msg=f"Success: completed processing file: {fp}",
-            to_stdout=True,
         )
+        if len(ops) >= WRITE_BATCH_SIZE:
+            if not _flush_updates(collection_handle, ops, fp):
+                return False
+            ops = []
+    if ops and not _flush_updates(collection_handle, ops, fp):
+        return False
+    log_msg(
+        logger=LOGGER,
+        msg=f"Success: completed processing file: {fp}",
+        to_stdout=True,
+    )
+    return True
+
+
+def _flush_updates(
+    collection_handle: Collection, ops: list[UpdateOne], fp: str
+) -> bool:
+    """Writes a batch of score updates, returns False if not every update modified an entry."""
+    bulk_result = collection_handle.bulk_write(ops, ordered=False)
+    if bulk_result.modified_count != len(ops):
+        log_str = f"Error updating entries for file {fp}"
+        log_str += f"\nExpected modified count: {len(ops)}"
+        log_str += f"\nMatched count: {bulk_result.matched_count}"
+        log_str += f"\nModified count: {bulk_result.modified_count}"
+        log_msg(logger=LOGGER, msg=log_str, level="error", to_stdout=True)
+        return False
     return True
 
 
@@ -86,12 +126,23 @@ def main():
         )
         sys.exit(1)
 
-    config_obj = get_config()
-    db_name = config_obj["dbinfo"]["dbname"]
-    biomarker_collection = config_obj["dbinfo"][db_name]["collection"]
+    biomarker_collection = biomarker_default()
     dbh = get_standard_db_handle(server=server)
 
-    if update_scores(glob_files, dbh[biomarker_collection]):
+    # every update matches on biomarker_id, make sure it is indexed (no-op when the
+    # load already created it)
+    setup_index(
+        collection=dbh[biomarker_collection],
+        index_field="biomarker_id",
+        unique=True,
+        index_name="biomarker_id_1",
+        logger=LOGGER,
+    )
+
+    # a failed batch already aborts the run, so don't wait on the journal for each one
+    collection_handle = bulk_collection(dbh[biomarker_collection], w=1, journal=False)
+
+    if update_scores(glob_files, collection_handle):
         log_msg(logger=LOGGER, msg="Success!", to_stdout=True)
     else:
         log_msg(
@@ -103,4 +154,8 @@ def main():
 
 
 if __name__ == "__main__":
-    main()
+    try:
+        main()
+    except DatabaseError as e:
+        log_msg(logger=LOGGER, msg=str(e), level="error", to_stdout=True)
+        sys.exit(1)
@@ -0,0 +1,35 @@
+import json
+import os
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from scores.map_scores import _map_file_scores
+
+SCORES = {"AN0001-1": {"score": 1.5, "score_info": {"contributions": []}}}
+
+
+def test_map_file_scores(tmp_path):
+    data = [{"biomarker_id": "AN0001-1", "value": 0.25}, {"biomarker_id": "AN0002-1"}]
+    fp = tmp_path / "data.json"
+    fp.write_text(json.dumps(data, indent=4))
+
+    _map_file_scores(str(fp), SCORES)
+
+    data[0]["score"] = 1.5
+    data[0]["score_info"] = {"contributions": []}
+    assert fp.read_text() == json.dumps(data, indent=4)
+
+
+def test_map_file_scores_wide_integer(tmp_path):
+    # wider than 64 bits, overflows the C ijson backend with use_float
+    wide_int = 2**70
+    data = [{"biomarker_id": "AN0001-1", "value": wide_int}]
+    fp = tmp_path / "data.json"
+    fp.write_text(json.dumps(data, indent=4))
+
+    _map_file_scores(str(fp), SCORES)
+
+    mapped = json.loads(fp.read_text())
+    assert mapped[0]["value"] == wide_int
+    assert mapped[0]["score"] == 1.5
+    assert not os.path.exists(f"{fp}.tmp")
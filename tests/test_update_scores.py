@@ -0,0 +1,36 @@
+import json
+import os
+import sys
+from unittest.mock import MagicMock
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from scores import update_scores
+from tutils.constants import biomarker_default
+
+
+def test_main(tmp_path, monkeypatch):
+    data = [
+        {"biomarker_id": "AN0001-1", "collision": 0, "score": 1.5, "score_info": {}},
+        {"biomarker_id": "AN0002-1", "collision": 1, "score": 0.5, "score_info": {}},
+    ]
+    (tmp_path / "data.json").write_text(json.dumps(data))
+
+    dbh = MagicMock()
+    collection = dbh.__getitem__.return_value
+    collection.list_index_names.return_value = []
+    bulk_handle = collection.with_options.return_value
+    bulk_handle.bulk_write.side_effect = lambda ops, ordered: MagicMock(
+        matched_count=len(ops), modified_count=len(ops)
+    )
+    monkeypatch.setattr(update_scores, "get_standard_db_handle", lambda server: dbh)
+    monkeypatch.setattr(
+        sys, "argv", ["update_scores.py", "dev", str(tmp_path / "*.json")]
+    )
+
+    update_scores.main()
+
+    dbh.__getitem__.assert_called_with(biomarker_default())
+    index_models = collection.create_indexes.call_args.args[0]
+    assert [model.document["name"] for model in index_models] == ["biomarker_id_1"]
+    (ops,) = bulk_handle.bulk_write.call_args.args
+    assert [op._filter for op in ops] == [{"biomarker_id": "AN0001-1"}]
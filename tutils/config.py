@@ -1,17 +1,21 @@
 import os
+from functools import lru_cache
 from tutils.general import load_json_type_safe
 from tutils import ROOT_DIR
 
 
+@lru_cache(maxsize=1)
 def get_config() -> dict:
-    """Loads the config file."""
+    """Loads the config file, parsed once per process and shared by every caller (treat
+    the returned dict as read only, `get_config.cache_clear()` forces a reload)."""
     config_obj = load_json_type_safe(
         filepath=os.path.join(ROOT_DIR, "api", "config.json"), return_type="dict"
     )
     return config_obj
 
 
-def get_server_list() -> list[str]:
-    """Returns a list of the servers."""
+@lru_cache(maxsize=1)
+def get_server_list() -> tuple[str, ...]:
+    """Returns the servers."""
     config = get_config()
-    return list(config["api_port"].keys())
+    return tuple(config["api_port"].keys())
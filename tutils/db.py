@@ -1,15 +1,100 @@
-import sys
+import atexit
+import hashlib
 import subprocess
-from pymongo import MongoClient
+from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor
+from pymongo import MongoClient, ReplaceOne
+from pymongo.write_concern import WriteConcern
+from bson import json_util
 import pymongo
 from pymongo.database import Database
 from pymongo.collection import Collection
 from logging import Logger
-from typing import Optional, NoReturn, Literal
+from typing import Optional, Literal, Mapping
+from types import MappingProxyType
 from urllib.parse import quote_plus
 from tutils.config import get_config
 from tutils.logging import log_msg
 
+# the pool only grows to what the concurrent bulk writers actually use (no minimum,
+# these are short lived scripts), idle sockets are let go after five minutes
+DEFAULT_POOL_OPTIONS = {
+    "maxPoolSize": 100,
+    "maxIdleTimeMS": 300_000,
+}
+ID_LOAD_BATCH_SIZE = 1_000
+INDEX_DIRECTIONS = {
+    "ascending": pymongo.ASCENDING,
+    "descending": pymongo.DESCENDING,
+}
+# one client per connection settings, shared by every handle to the same deployment
+_CLIENT_CACHE: dict[tuple, MongoClient] = {}
+
+
+class DatabaseError(Exception):
+    """Raised when a database handle can't be set up."""
+
+
+def _close_clients() -> None:
+    """Closes the cached clients on interpreter exit."""
+    for client in _CLIENT_CACHE.values():
+        client.close()
+    _CLIENT_CACHE.clear()
+
+
+atexit.register(_close_clients)
+
+
+def _get_client(
+    host: str,
+    username: str,
+    password: str,
+    auth_source: str,
+    auth_mechanism: str,
+    timeout: int,
+    client_options: tuple[tuple[str, object], ...],
+) -> MongoClient:
+    """Returns the cached MongoClient for the connection settings, creating it on first
+    use so every handle to the same deployment shares one client (and its connection pool
+    and topology monitoring)."""
+    key = (
+        host,
+        username,
+        password,
+        auth_source,
+        auth_mechanism,
+        timeout,
+        client_options,
+    )
+    client = _CLIENT_CACHE.get(key)
+    if client is None:
+        client = _CLIENT_CACHE.setdefault(
+            key,
+            MongoClient(
+                host=host,
+                username=username,
+                password=password,
+                authSource=auth_source,
+                authMechanism=auth_mechanism,
+                serverSelectionTimeoutMS=timeout,
+                **dict(client_options),
+            ),
+        )
+    return client
+
+
+def _get_uri_client(connection_string: str) -> MongoClient:
+    """Returns the cached MongoClient for a connection string (as built by
+    get_connection_string), sharing the client cache and pool options with the
+    standard handles."""
+    key = (connection_string, tuple(sorted(DEFAULT_POOL_OPTIONS.items())))
+    client = _CLIENT_CACHE.get(key)
+    if client is None:
+        client = _CLIENT_CACHE.setdefault(
+            key, MongoClient(connection_string, **DEFAULT_POOL_OPTIONS)
+        )
+    return client
+
 
 def get_database_handle(
     db_name: str,
@@ -20,42 +105,56 @@ def get_database_handle(
     auth_source: Optional[str] = None,
     auth_mechanism: str = "SCRAM-SHA-1",
     timeout: int = 1_000,
-) -> Database | NoReturn:
-    """Returns a database handle."""
+    **client_kwargs,
+) -> Database:
+    """Returns a database handle. Any extra keyword arguments (e.g. `w`, `journal`,
+    `maxPoolSize`) are forwarded to the MongoClient and must be hashable, the client
+    is shared between calls with the same settings. Raises a DatabaseError if the
+    client can't be created."""
     try:
         auth_source = db_name if auth_source is None else auth_source
-        client: MongoClient = MongoClient(
+        client = _get_client(
             host=f"{host}{port}",
             username=username,
             password=password,
-            authSource=auth_source,
-            authMechanism=auth_mechanism,
-            serverSelectionTimeoutMS=timeout,
+            auth_source=auth_source,
+            auth_mechanism=auth_mechanism,
+            timeout=timeout,
+            client_options=tuple(sorted(client_kwargs.items())),
         )
         dbh = client[db_name]
         return dbh
     except Exception as e:
-        print(e)
-        sys.exit(1)
+        raise DatabaseError(
+            f"Unable to get a handle to database `{db_name}`: {e}"
+        ) from e
 
 
+@lru_cache(maxsize=None)
 def get_standard_db_handle(server: str) -> Database:
-    """Gets the standard database handle."""
+    """Gets the standard database handle, cached per server so repeated calls reuse the same client."""
     config_obj = get_config()
     port = config_obj["dbinfo"]["port"][server]
     db_name = config_obj["dbinfo"]["dbname"]
     db_user = config_obj["dbinfo"][db_name]["user"]
     db_pass = config_obj["dbinfo"][db_name]["password"]
+    # MongoClient pool options, an optional `pool` entry in the dbinfo config overrides them
+    pool_options = {**DEFAULT_POOL_OPTIONS, **config_obj["dbinfo"].get("pool", {})}
     return get_database_handle(
-        db_name=db_name, port=port, username=db_user, password=db_pass
+        db_name=db_name,
+        port=port,
+        username=db_user,
+        password=db_pass,
+        **pool_options,
     )
 
 
-def get_collections() -> dict[str, str]:
-    """Gets a list of the collections."""
+@lru_cache(maxsize=1)
+def get_collections() -> Mapping[str, str]:
+    """Gets the collections, resolved once and returned as a read only view."""
     config = get_config()
     db_name = config["dbinfo"]["dbname"]
-    return config["dbinfo"][db_name]["collections"]
+    return MappingProxyType(config["dbinfo"][db_name]["collections"])
 
 
 def setup_index(
@@ -65,6 +164,7 @@ def setup_index(
     order: Literal["ascending", "descending"] = "ascending",
     index_name: Optional[str] = None,
     logger: Optional[Logger] = None,
+    partial_filter: Optional[dict] = None,
 ) -> None:
     """Sets up a regular index on a field.
 
@@ -82,29 +182,116 @@ def setup_index(
         The name of the index to create, will be assigned a default name if None.
     logger: Logger, optional
         A logger to log status messages to.
+    partial_filter: dict, optional
+        A partialFilterExpression restricting the index to the matching documents.
     """
-    if index_name is None:
-        index_name = f"{index_field}_{order}"
-    if index_name not in collection.index_information():
-        if order == "ascending":
-            collection.create_index(
-                [(index_field, pymongo.ASCENDING)], name=index_name, unique=unique
+    setup_indexes(
+        collection=collection,
+        specs=[(index_field, order, unique, index_name)],
+        logger=logger,
+        partial_filter=partial_filter,
+    )
+
+
+def setup_indexes(
+    collection: Collection,
+    specs: list[tuple[str, Literal["ascending", "descending"], bool, Optional[str]]],
+    logger: Optional[Logger] = None,
+    partial_filter: Optional[dict] = None,
+) -> None:
+    """Sets up several regular indexes on a collection with a single create_indexes
+    command, skipping the ones that already exist.
+
+    Parameters
+    ----------
+    collection: Collection
+        The database collection.
+    specs: list[tuple[str, Literal["ascending", "descending"], bool, Optional[str]]]
+        The (index_field, order, unique, index_name) spec for each index, the index
+        name will be assigned a default name if None.
+    logger: Logger, optional
+        A logger to log status messages to.
+    partial_filter: dict, optional
+        A partialFilterExpression applied to each of the indexes.
+    """
+    index_options: dict = {}
+    name_suffix = ""
+    if partial_filter is not None:
+        index_options["partialFilterExpression"] = partial_filter
+        # keep the default names distinct per filter so a partial index doesn't shadow
+        # the full index (or a partial index with a different filter) on the same field
+        filter_digest = hashlib.sha1(
+            json_util.dumps(partial_filter, sort_keys=True).encode()
+        ).hexdigest()[:8]
+        name_suffix = f"_partial_{filter_digest}"
+    existing_indexes = set(collection.list_index_names())
+    models: list[pymongo.IndexModel] = []
+    status_messages: list[str] = []
+    for index_field, order, unique, index_name in specs:
+        if index_name is None:
+            index_name = f"{index_field}_{order}{name_suffix}"
+        if index_name in existing_indexes:
+            status_messages.append(
+                f"{order.title()} index `{index_name}` on collection `{collection.name}` already exists."
             )
-        elif order == "descending":
-            collection.create_index(
-                [(index_field, pymongo.DESCENDING)], name=index_name, unique=unique
+            continue
+        models.append(
+            pymongo.IndexModel(
+                [(index_field, INDEX_DIRECTIONS[order])],
+                name=index_name,
+                unique=unique,
+                **index_options,
             )
-        status_message = (
+        )
+        status_messages.append(
             f"Created `{order}` index `{index_name}` on collection `{collection.name}`."
         )
+    if models:
+        collection.create_indexes(models)
+    for status_message in status_messages:
         if logger is not None:
             log_msg(logger=logger, msg=status_message)
         print(status_message)
+
+
+def setup_compound_index(
+    collection: Collection,
+    fields: list[tuple[str, Literal["ascending", "descending"]]],
+    unique: bool = False,
+    index_name: Optional[str] = None,
+    logger: Optional[Logger] = None,
+) -> None:
+    """Sets up a compound index over several fields.
+
+    Parameters
+    ----------
+    collection: Collection
+        The database collection.
+    fields: list[tuple[str, Literal["ascending", "descending"]]]
+        The (index_field, order) pairs, in index key order.
+    unique: bool, optional
+        Whether to make the index unique, defaults to False.
+    index_name: str, optional
+        The name of the index to create, will be assigned a default name if None.
+    logger: Logger, optional
+        A logger to log status messages to.
+    """
+    if index_name is None:
+        index_name = "_".join(f"{index_field}_{order}" for index_field, order in fields)
+    if index_name not in collection.list_index_names():
+        collection.create_index(
+            [(index_field, INDEX_DIRECTIONS[order]) for index_field, order in fields],
+            name=index_name,
+            unique=unique,
+        )
+        status_message = (
+            f"Created compound index `{index_name}` on collection `{collection.name}`."
+        )
     else:
-        status_message = f"{order.title()} index `{index_name}` on collection `{collection.name}` already exists."
-        if logger is not None:
-            log_msg(logger=logger, msg=status_message)
-        print(status_message)
+        status_message = f"Compound index `{index_name}` on collection `{collection.name}` already exists."
+    if logger is not None:
+        log_msg(logger=logger, msg=status_message)
+    print(status_message)
 
 
 def create_text_index(collection: Collection, logger: Optional[Logger] = None) -> None:
@@ -116,13 +303,15 @@ def create_text_index(collection: Collection, logger: Optional[Logger] = None) -
     print(status_message)
 
 
+@lru_cache(maxsize=8)
 def get_connection_string(
     server: str,
     host: str = "127.0.0.1:",
     auth_source: Optional[str] = None,
     auth_mechanism: str = "SCRAM-SHA-1",
 ) -> str:
-    """Return a connection string."""
+    """Return a connection string, cached per set of arguments (the config is cached
+    as well, call `get_connection_string.cache_clear()` if it is ever reloaded)."""
     config_obj = get_config()
     db_name = config_obj["dbinfo"]["dbname"]
     port = config_obj["dbinfo"]["port"][server]
@@ -172,7 +361,72 @@ def dump_id_collection(connection_string: str, save_path: str, collection: str)
     return True
 
 
-def load_id_collection(connection_string: str, load_path: str, collection: str) -> bool:
+def dump_id_collections(
+    connection_string: str, save_paths: dict[str, str], max_workers: int = 4
+) -> dict[str, bool]:
+    """Dumps several ID collections concurrently, one `mongoexport` per collection.
+
+    Parameters
+    ----------
+    connection_string: str
+        Connection string for the MongoDB connection.
+    save_paths: dict[str, str]
+        Mapping of the collections to dump to their local save paths.
+    max_workers: int, optional
+        The maximum number of concurrent exports, defaults to 4.
+
+    Returns
+    -------
+    dict[str, bool]
+        Indication if each collection was dumped successfully.
+    """
+    # the workers just wait on the mongoexport processes so threads are enough here
+    with ThreadPoolExecutor(
+        max_workers=max(1, min(len(save_paths), max_workers))
+    ) as executor:
+        futures = {
+            collection: executor.submit(
+                dump_id_collection, connection_string, save_path, collection
+            )
+            for collection, save_path in save_paths.items()
+        }
+    return {collection: future.result() for collection, future in futures.items()}
+
+
+def bulk_collection(
+    collection: Collection, w: int = 1, journal: bool = False
+) -> Collection:
+    """Returns a view of the collection with a relaxed write concern for idempotent
+    bulk loads.
+
+    Parameters
+    ----------
+    collection: Collection
+        The database collection.
+    w: int, optional
+        The number of acknowledgements to wait for, 0 for unacknowledged writes,
+        defaults to 1.
+    journal: bool, optional
+        Whether to wait for the writes to be journaled, defaults to False.
+
+    Returns
+    -------
+    Collection
+        The collection with the write concern applied.
+    """
+    # an unacknowledged write can't also ask for the journal
+    write_concern = WriteConcern(w=w, j=journal) if w else WriteConcern(w=0)
+    return collection.with_options(write_concern=write_concern)
+
+
+def load_id_collection(
+    connection_string: str,
+    load_path: str,
+    collection: str,
+    use_bulk: bool = True,
+    w: int = 1,
+    journal: bool = False,
+) -> bool:
     """Loads the local ID collections into the prod database.
 
     Parameters
@@ -183,12 +437,38 @@ def load_id_collection(connection_string: str, load_path: str, collection: str)
         The filepath to the local ID map.
     collection : str
         The collection to load into.
+    use_bulk : bool, optional
+        Whether to upsert the documents with batched pymongo bulk writes, or fall back
+        to shelling out to `mongoimport --mode upsert`. Defaults to True.
+    w : int, optional
+        The write concern for the bulk upserts, defaults to 1. The load is idempotent
+        so w=0 can be used to skip waiting on the acknowledgement of each batch.
+    journal : bool, optional
+        Whether the bulk upserts wait for the journal, defaults to False.
 
     Returns
     -------
     bool
         Indication if the collection was loaded successfully.
     """
+    if use_bulk:
+        try:
+            _bulk_upsert_id_collection(
+                connection_string=connection_string,
+                load_path=load_path,
+                collection=collection,
+                w=w,
+                journal=journal,
+            )
+        except Exception as e:
+            print("Args passed:")
+            print(f"Connection string: {connection_string}")
+            print(f"Load path: {load_path}")
+            print(f"Collection: {collection}")
+            print(e)
+            return False
+        return True
+
     command = [
         "mongoimport",
         "--uri",
@@ -211,3 +491,28 @@ def load_id_collection(connection_string: str, load_path: str, collection: str)
         print(e)
         return False
     return True
+
+
+def _bulk_upsert_id_collection(
+    connection_string: str, load_path: str, collection: str, w: int, journal: bool
+) -> None:
+    """Streams a mongoexport dump (one extended JSON document per line) into the
+    collection, replacing documents by `_id` like `mongoimport --mode upsert` does but in
+    unordered batches of ID_LOAD_BATCH_SIZE instead of one upsert at a time."""
+    # the client is cached and shared across the ID collections, it is closed on exit
+    client = _get_uri_client(connection_string)
+    collection_handle = bulk_collection(
+        client.get_default_database()[collection], w=w, journal=journal
+    )
+    ops: list[ReplaceOne] = []
+    with open(load_path, "r") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            document = json_util.loads(line)
+            ops.append(ReplaceOne({"_id": document["_id"]}, document, upsert=True))
+            if len(ops) >= ID_LOAD_BATCH_SIZE:
+                collection_handle.bulk_write(ops, ordered=False)
+                ops = []
+    if ops:
+        collection_handle.bulk_write(ops, ordered=False)
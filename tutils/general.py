@@ -2,8 +2,13 @@ import json
 import sys
 import os
 import decimal
-import subprocess
-from typing import Union, Literal, overload, Optional, NoReturn
+import shutil
+from typing import Union, Literal, overload, Optional, NoReturn, Iterator
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 
 def load_json(filepath: str) -> Union[dict, list]:
@@ -19,11 +24,40 @@ def load_json(filepath: str) -> Union[dict, list]:
     dict or list
         The JSON object.
     """
-    with open(filepath, "r") as f:
-        json_obj = json.load(f)
+    if orjson is None:
+        with open(filepath, "r") as f:
+            json_obj = json.load(f)
+        return json_obj
+    with open(filepath, "rb") as f:
+        raw = f.read()
+    try:
+        json_obj = orjson.loads(raw)
+    except orjson.JSONDecodeError:
+        # orjson is stricter than the stdlib (e.g. NaN or integers over 64 bits), fall
+        # back so those files still load
+        json_obj = json.loads(raw)
     return json_obj
 
 
+def iter_jsonl(filepath: str) -> Iterator[dict]:
+    """Lazily yields the entries of a newline delimited JSON (JSONL) file.
+
+    Parameters
+    ----------
+    filepath: str
+        The path to the JSONL file.
+
+    Yields
+    ------
+    dict
+        One entry per (non blank) line.
+    """
+    with open(filepath, "rb") as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
 @overload
 def load_json_type_safe(filepath: str, return_type: Literal["dict"]) -> dict:
     pass
@@ -120,5 +154,9 @@ def resolve_symlink(path: str) -> Optional[str]:
 
 
 def copy_file(src: str, dest: str) -> None:
-    """Copies a file from src to dest."""
-    subprocess.run(["cp", src, dest], check=True)
+    """Copies a file from src to dest (a file path or a directory).
+
+    Uses shutil.copy in process, which copies the data in the kernel with sendfile on
+    Linux instead of forking a `cp` process per file.
+    """
+    shutil.copy(src, dest)
@@ -4,6 +4,14 @@ import os
 from typing import Literal
 from tutils import ROOT_DIR
 
+LOGS_DIR = os.path.join(ROOT_DIR, "logs")
+
+LOG_LEVELS = {
+    "info": logging.INFO,
+    "warning": logging.WARNING,
+    "error": logging.ERROR,
+}
+
 
 def setup_logging(logger_name: str) -> Logger:
     """Sets up a logger for the calling script.
@@ -18,10 +26,9 @@ def setup_logging(logger_name: str) -> Logger:
     Logger
     """
     logger = logging.getLogger(logger_name)
-    log_dir_path = os.path.join(ROOT_DIR, "logs")
-    if not os.path.isdir(log_dir_path):
-        os.mkdir(log_dir_path)
-    handler = logging.FileHandler(os.path.join(ROOT_DIR, "logs", logger_name))
+    if not os.path.isdir(LOGS_DIR):
+        os.mkdir(LOGS_DIR)
+    handler = logging.FileHandler(f"{LOGS_DIR}/{logger_name}")
     formatter = logging.Formatter("%(asctime)s %(levelname)s %(message)s")
     handler.setFormatter(formatter)
     logger.addHandler(handler)
@@ -34,6 +41,7 @@ def log_msg(
     msg: str,
     level: Literal["info", "warning", "error"] = "info",
     to_stdout: bool = False,
+    args: tuple = (),
 ) -> None:
     """Logs and optionally prints a message.
 
@@ -42,20 +50,20 @@ def log_msg(
     logger: Logger
         The logger to use.
     msg: str
-        The message to log.
+        The message to log, may be a %-format string for the args.
     level: Literal["info", "warning", "error"], optional
         The log level, defaults to "info".
     to_stdout: bool, optional
         Whether to print the message as well, defaults to False.
+    args: tuple, optional
+        Arguments merged into msg with %-formatting, the formatting is deferred to
+        the logging handler unless the message is also printed.
     """
-    if level == "info":
-        logger.info(msg)
-    elif level == "warning":
-        logger.warning(msg)
-    elif level == "error":
-        logger.error(msg)
+    level_no = LOG_LEVELS.get(level)
+    if level_no is not None:
+        logger.log(level_no, msg, *args)
     if to_stdout:
-        print(msg)
+        print(msg % args if args else msg)
 
 
 def start_message(logger: Logger, msg: str) -> None:
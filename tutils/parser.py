@@ -2,20 +2,28 @@ import argparse
 from argparse import ArgumentParser
 import sys
 import os
+from functools import lru_cache
 from typing import NoReturn, Optional
 from tutils.config import get_server_list
 
 
-def standard_parser() -> tuple[ArgumentParser, list[str]]:
-    """Creates a standard parser that just takes `server` as a required positional argument."""
+@lru_cache(maxsize=1)
+def _server_help() -> tuple[tuple[str, ...], str]:
+    """Returns the server list along with its joined help string."""
     server_list = get_server_list()
+    return server_list, "/".join(server_list)
+
+
+def standard_parser() -> tuple[ArgumentParser, tuple[str, ...]]:
+    """Creates a standard parser that just takes `server` as a required positional argument."""
+    server_list, server_help = _server_help()
     parser = argparse.ArgumentParser(prog=os.path.basename(__file__))
-    parser.add_argument("server", help="/".join(server_list))
+    parser.add_argument("server", help=server_help)
     return parser, server_list
 
 
 def parse_server(
-    parser: ArgumentParser, server: Optional[str], server_list: list[str]
+    parser: ArgumentParser, server: Optional[str], server_list: tuple[str, ...]
 ) -> NoReturn | str:
     """Parses the standard server argument."""
     if server is None: